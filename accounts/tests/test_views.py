@@ -10,6 +10,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from PIL import Image
 from django.contrib.messages import get_messages
 from app.models.post_models import Post
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 User = get_user_model()
@@ -91,6 +94,7 @@ class ProfileDetailViewTests(TestCase):
         self.profile = Profile.objects.get(user=self.user)
         self.profile.username = 'test_user'
         self.profile.save()
+        cache.clear()
 
         for i in range(13):
             Post.objects.create(
@@ -161,6 +165,34 @@ class ProfileDetailViewTests(TestCase):
         self.assertEqual(len(response.context['page_obj']), 3)
         self.assertEqual(response.context['page_obj'].number, 3)
 
+    def test_129_profile_detail_view_post_count_is_cached(self):
+        """
+        投稿数はキャッシュを使い、表示するのは現在のページの投稿のみであることを確認
+        """
+        url = reverse('accounts:profile_detail', kwargs={'username': self.profile.username})
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': 2})
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertEqual(len(response.context['posts']), 5)
+        self.assertContains(response, 'no.7_Post')
+        self.assertNotContains(response, 'no.12_Post')
+
+        Post.objects.create(
+            user=self.user,
+            post_title='no.13_Post',
+            reason='reason',
+            impressions='impressions',
+            satisfaction=5,
+            book_title='book_title',
+            author='author',
+            isbn='1234567890123'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
 
 class ProfileUpdateViewTests(TestCase):
 
@@ -211,6 +243,13 @@ class ProfileUpdateViewTests(TestCase):
         """
         postメソッドにて、正常にデータ更新されているかを確認
         """
+        # アップロードした画像をリポジトリのmediaに残さない
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_patcher = self.settings(MEDIA_ROOT=media_root.name)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
         self.client.login(
             email='test@test.com',
             password='test0000'
@@ -10,7 +10,7 @@ from django.contrib.auth import get_user_model
 from accounts.models.profile_models import Profile
 from accounts.forms.profile_forms import ProfileForm
 from app.models.post_models import Post
-from django.core.paginator import Paginator
+from app.paginators import CachedCountPaginator, count_key
 
 User = get_user_model()
 
@@ -24,17 +24,16 @@ class ProfileDetailView(DetailView):
             profile = get_object_or_404(Profile, username=kwargs['username'])
             posts = Post.objects.filter(user_id=profile.user_id).order_by('-created_at')
 
-            for post in posts:
-                post.satisfaction_int = int(post.satisfaction)
-                print(post.satisfaction_int)
-
-            paginator = Paginator(posts, 5)
+            paginator = CachedCountPaginator(posts, 5, cache_key=count_key('posts', profile.user_id))
             page_number = request.GET.get("page")
             page_obj = paginator.get_page(page_number)
 
+            for post in page_obj:
+                post.satisfaction_int = int(post.satisfaction)
+
             return render(request, 'account/profile_detail.html', context={
                 'profile': profile,
-                'posts': posts,
+                'posts': page_obj,
                 'satisfaction_range': range(5),
                 'page_obj': page_obj
             })
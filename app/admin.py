@@ -1,6 +1,8 @@
 from django.contrib import admin
 from .models.post_models import Post
 from .models.comment_models import Comment
+from .models.book_models import Book
 
 admin.site.register(Post)
 admin.site.register(Comment)
+admin.site.register(Book)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from app.services.comment_services import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = '投稿のコメント数・最終コメント日時を実際のコメントから数え直す'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='更新せず、ずれている投稿を表示する')
+        parser.add_argument('--batch-size', type=int, default=500, help='1回の更新で数え直す投稿の数')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_comment_counts(
+            dry_run=options['dry_run'],
+            batch_size=max(1, options['batch_size']),
+        )
+
+        if options['dry_run']:
+            for pk in drifted:
+                self.stdout.write(f'post {pk}')
+            self.stdout.write(f'{len(drifted)}件の投稿のコメント数がずれています。')
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)}件の投稿のコメント数を修正しました。'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from app.services.fake_rakuten_services import FakeRakutenServer, FaultConfig
+
+
+class Command(BaseCommand):
+    help = '楽天ブックス書籍検索APIの代わりになるローカルサーバーを起動する(RAKUTEN_API_URLに表示されたURLを設定して使う)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--catalog-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--latency', type=float, default=0.0, help='応答までの遅延(秒)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='遅延に加えるランダムな揺らぎ(秒)')
+        parser.add_argument('--rate-429', type=float, default=0.0, help='429を返す確率')
+        parser.add_argument('--rate-5xx', type=float, default=0.0, help='503を返す確率')
+        parser.add_argument('--rate-timeout', type=float, default=0.0, help='応答しない確率')
+        parser.add_argument('--timeout-seconds', type=float, default=30.0, help='応答しない場合に止める秒数')
+
+    def handle(self, *args, **options):
+        faults = FaultConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            rate_429=options['rate_429'],
+            rate_5xx=options['rate_5xx'],
+            rate_timeout=options['rate_timeout'],
+            timeout_seconds=options['timeout_seconds'],
+        )
+        server = FakeRakutenServer(
+            host=options['host'],
+            port=options['port'],
+            catalog_size=options['catalog_size'],
+            faults=faults,
+            seed=options['seed'],
+        )
+
+        self.stdout.write(f'RAKUTEN_API_URL={server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
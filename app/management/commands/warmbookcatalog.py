@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app.models.book_models import Book
+from app.models.post_models import Post
+from app.services.book_services import fetch_isbn_records, store_book
+from app.services.ratelimit_services import PRIORITY_LOW
+from app.services.rakuten_services import circuit_breaker
+
+
+class Command(BaseCommand):
+    help = '投稿されている本のうち、カタログ未登録または情報が古いものをAPIから取得してカタログを更新する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='同時にAPIを呼び出す数')
+        parser.add_argument('--retries', type=int, default=3, help='レート制限などで取得できなかった場合の再試行回数')
+        parser.add_argument('--limit', type=int, default=None, help='1回の実行で更新する上限件数')
+        parser.add_argument('--all', action='store_true', help='情報が新しい本も含めてすべて更新する')
+
+    def handle(self, *args, **options):
+        isbns = self.target_isbns(options['all'])
+        if options['limit'] is not None:
+            isbns = isbns[:options['limit']]
+
+        self.stdout.write(f'{len(isbns)}件の本を更新します。')
+        results = {'updated': 0, 'not_found': 0, 'failed': 0}
+
+        # APIの呼び出しのみ同時実行数を絞ったワーカーで行い(低優先度でレート制限に従う)、
+        # カタログへの書き込みはこのスレッドでまとめて行う
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            for isbn, records in zip(isbns, executor.map(
+                lambda isbn: self.fetch(isbn, options['retries']), isbns
+            )):
+                result = self.store(isbn, records)
+                results[result] += 1
+                if result != 'updated':
+                    self.stderr.write(f'{isbn}: {result}')
+
+        self.stdout.write(self.style.SUCCESS(
+            '更新: {updated}件, 該当なし: {not_found}件, 失敗: {failed}件'.format(**results)
+        ))
+
+    def target_isbns(self, refresh_all=False):
+        isbns = Post.objects.exclude(isbn='').order_by('isbn').values_list('isbn', flat=True).distinct()
+        if refresh_all:
+            return list(isbns)
+
+        fresh_since = timezone.now() - timedelta(seconds=settings.BOOK_CATALOG_TTL)
+        fresh = set(
+            Book.objects.filter(fetched_at__gte=fresh_since).values_list('isbn', flat=True)
+        )
+        return [isbn for isbn in isbns if isbn not in fresh]
+
+    def fetch(self, isbn, retries):
+        for attempt in range(retries + 1):
+            if circuit_breaker.is_open():
+                return None
+            records = fetch_isbn_records(isbn, priority=PRIORITY_LOW)
+            if records is not None:
+                return records
+            if attempt < retries:
+                time.sleep(2 ** attempt)
+        return None
+
+    def store(self, isbn, records):
+        if records is None:
+            return 'failed'
+        try:
+            store_book(isbn, records)
+        except Book.DoesNotExist:
+            return 'not_found'
+        return 'updated'
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:47
+
+import app.models.book_models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_add_comment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('isbn', models.CharField(max_length=13, unique=True, verbose_name='ISBNコード')),
+                ('title', models.CharField(max_length=255, verbose_name='本のタイトル')),
+                ('author', models.CharField(blank=True, max_length=255, verbose_name='著者名')),
+                ('sales_date', models.CharField(blank=True, max_length=50, verbose_name='発売日')),
+                ('publisher_name', models.CharField(blank=True, max_length=255, verbose_name='出版社')),
+                ('item_caption', models.TextField(blank=True, verbose_name='説明')),
+                ('large_image_url', models.URLField(blank=True, max_length=500, verbose_name='画像URL')),
+                ('item_url', models.URLField(blank=True, max_length=500, verbose_name='販売ページURL')),
+                ('review_average', models.CharField(blank=True, max_length=10, verbose_name='レビュー平均')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='レビュー件数')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='取得日時')),
+            ],
+            options={
+                'db_table': 'books',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='book',
+            field=app.models.book_models.BookRelation(blank=True, from_fields=('isbn',), null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='posts', to='app.book', to_fields=('isbn',)),
+        ),
+    ]
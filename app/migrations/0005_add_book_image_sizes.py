@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_add_book'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='medium_image_url',
+            field=models.URLField(blank=True, max_length=500, verbose_name='画像URL(中)'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='small_image_url',
+            field=models.URLField(blank=True, max_length=500, verbose_name='画像URL(小)'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:18
+
+from django.db import migrations, models
+from app.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # PostgreSQLでは CREATE INDEX CONCURRENTLY をトランザクションの外で実行する
+    atomic = False
+
+    dependencies = [
+        ('app', '0005_add_book_image_sizes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at'], name='comments_post_created_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['-updated_at', '-id'], name='posts_updated_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='posts_user_updated_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['user', '-created_at'], name='posts_user_created_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['isbn'], name='posts_isbn_idx'),
+        ),
+    ]
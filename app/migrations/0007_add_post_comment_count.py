@@ -0,0 +1,39 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:23
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_counts(apps, schema_editor):
+    Post = apps.get_model('app', 'Post')
+    Comment = apps.get_model('app', 'Comment')
+    comments = Comment.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id')
+    Post.objects.update(
+        comment_count=Coalesce(
+            Subquery(comments.annotate(count=Count('pk')).values('count')),
+            Value(0),
+        ),
+        last_commented_at=Subquery(comments.annotate(latest=Max('created_at')).values('latest')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_add_post_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='コメント数'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_commented_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最終コメント日時'),
+        ),
+        migrations.RunPython(fill_comment_counts, migrations.RunPython.noop),
+    ]
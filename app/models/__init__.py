@@ -1,2 +1,3 @@
+from .book_models import *
 from .post_models import *
 from .comment_models import *
@@ -0,0 +1,115 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import models
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.utils import timezone
+
+
+class Book(models.Model):
+    isbn = models.CharField(
+        max_length=13,
+        unique=True,
+        verbose_name='ISBNコード'
+    )
+    title = models.CharField(
+        max_length=255,
+        verbose_name='本のタイトル'
+    )
+    author = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='著者名'
+    )
+    sales_date = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='発売日'
+    )
+    publisher_name = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='出版社'
+    )
+    item_caption = models.TextField(
+        blank=True,
+        verbose_name='説明'
+    )
+    small_image_url = models.URLField(
+        max_length=500,
+        blank=True,
+        verbose_name='画像URL(小)'
+    )
+    medium_image_url = models.URLField(
+        max_length=500,
+        blank=True,
+        verbose_name='画像URL(中)'
+    )
+    large_image_url = models.URLField(
+        max_length=500,
+        blank=True,
+        verbose_name='画像URL'
+    )
+    item_url = models.URLField(
+        max_length=500,
+        blank=True,
+        verbose_name='販売ページURL'
+    )
+    review_average = models.CharField(
+        max_length=10,
+        blank=True,
+        verbose_name='レビュー平均'
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='レビュー件数'
+    )
+    fetched_at = models.DateTimeField(
+        verbose_name='取得日時',
+        default=timezone.now,
+    )
+
+    class Meta:
+        db_table = 'books'
+        app_label = 'app'
+
+    def __str__(self):
+        return f'{self.title} | {self.isbn}'
+
+    def image_url(self, size):
+        return select_image_url(self, size)
+
+    def is_stale(self):
+        ttl = timedelta(seconds=settings.BOOK_CATALOG_TTL)
+        return self.fetched_at < timezone.now() - ttl
+
+
+# APIの画像の大きさ(一辺の最大px)
+IMAGE_SIZES = (
+    (64, 'small_image_url'),
+    (120, 'medium_image_url'),
+    (200, 'large_image_url'),
+)
+
+
+def select_image_url(book, size):
+    """
+    一辺がsize px以上の画像のうち最も小さいものを返す(ない場合は最も大きいもの)
+    """
+    urls = [(image_size, getattr(book, attr)) for image_size, attr in IMAGE_SIZES if getattr(book, attr)]
+    for image_size, url in urls:
+        if image_size >= size:
+            return url
+    return urls[-1][1] if urls else ''
+
+
+class BookDescriptor(ForwardManyToOneDescriptor):
+    def get_object(self, instance):
+        # カタログ未登録のISBNは参照元から見て「本なし」として扱う
+        try:
+            return super().get_object(instance)
+        except self.field.remote_field.model.DoesNotExist:
+            return None
+
+
+class BookRelation(models.ForeignObject):
+    forward_related_accessor_class = BookDescriptor
@@ -25,6 +25,10 @@ class Comment(models.Model):
     class Meta:
         db_table = 'comments'
         app_label = 'app'
+        indexes = [
+            # 投稿詳細ページのコメント一覧
+            models.Index(fields=['post', '-created_at'], name='comments_post_created_at_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.profile.name} | {self.post.post_title}'
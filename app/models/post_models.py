@@ -1,10 +1,34 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from app.models.book_models import Book, BookRelation
 
 
 User = get_user_model()
 
+
+class PostQuerySet(models.QuerySet):
+
+    def for_list(self):
+        """
+        投稿一覧に表示する項目のみを、投稿者のプロフィールと合わせて1回のクエリで取得する
+        """
+        return self.select_related('user__profile').only(
+            'post_title',
+            'book_title',
+            'satisfaction',
+            'created_at',
+            'updated_at',
+            'comment_count',
+            'last_commented_at',
+            'user__id',
+            'user__profile__user',
+            'user__profile__name',
+            'user__profile__username',
+            'user__profile__image',
+        )
+
+
 class Post(models.Model):
     user = models.ForeignKey(
         User,
@@ -42,6 +66,15 @@ class Post(models.Model):
         max_length=13,
         verbose_name='ISBNコード'
     )
+    book = BookRelation(
+        Book,
+        from_fields=('isbn',),
+        to_fields=('isbn',),
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name='posts',
+    )
     created_at = models.DateTimeField(
         verbose_name="登録日時",
         auto_now_add=True,
@@ -50,10 +83,32 @@ class Post(models.Model):
         verbose_name="更新日時",
         auto_now=True,
     )
+    # コメントの追加・削除と同じトランザクションで更新する(ずれた場合は reconcilecommentcounts で直す)
+    comment_count = models.PositiveIntegerField(
+        verbose_name='コメント数',
+        default=0,
+    )
+    last_commented_at = models.DateTimeField(
+        verbose_name='最終コメント日時',
+        null=True,
+        blank=True,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         db_table = 'posts'
         app_label = 'app'
+        indexes = [
+            # 投稿一覧(更新日時の降順)
+            models.Index(fields=['-updated_at', '-id'], name='posts_updated_at_idx'),
+            # マイページの投稿一覧
+            models.Index(fields=['user', '-updated_at', '-id'], name='posts_user_updated_at_idx'),
+            # プロフィールページの投稿一覧
+            models.Index(fields=['user', '-created_at'], name='posts_user_created_at_idx'),
+            # 書籍情報の取得・カタログの更新対象の抽出
+            models.Index(fields=['isbn'], name='posts_isbn_idx'),
+        ]
 
     def __str__(self):
         return f'{self.post_title} | {self.user.profile.name} | {self.book_title}'
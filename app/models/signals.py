@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .book_models import Book
+from .post_models import Post
+from .comment_models import Comment
+from app.paginators import count_key
+from app.services.autocomplete_services import book_autocomplete
+from app.services.comment_services import record_comment_added, record_comment_deleted
+
+
+# 追加は候補の索引に差分で反映し、変更・削除の時のみ作り直す
+@receiver(post_save, sender=Post)
+def update_post_autocomplete(sender, instance, created, **kwargs):
+    if created:
+        book_autocomplete.add(instance.book_title, instance.author)
+    else:
+        book_autocomplete.invalidate()
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_post_autocomplete(sender, instance, **kwargs):
+    book_autocomplete.invalidate()
+
+
+# 本の情報はAPIから取得するたびに更新されるため、更新はAUTOCOMPLETE_TTLで反映する
+@receiver(post_save, sender=Book)
+def add_book_autocomplete(sender, instance, created, **kwargs):
+    if created:
+        book_autocomplete.add(instance.title, instance.author)
+
+
+@receiver(post_delete, sender=Book)
+def invalidate_book_autocomplete(sender, instance, **kwargs):
+    book_autocomplete.invalidate()
+
+
+# ページ送りでキャッシュしている件数は、作成・削除の時のみ消す(更新では件数が変わらない)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def reset_post_count(sender, instance, **kwargs):
+    if kwargs.get('created', True):
+        cache.delete(count_key('posts', instance.user_id))
+
+
+@receiver(post_save, sender=Comment)
+def add_comment_to_post(sender, instance, created, **kwargs):
+    if created:
+        record_comment_added(instance)
+
+
+# 投稿(または投稿したユーザー)の削除で一緒に削除されるコメントは、削除される投稿を更新しない
+# 削除の起点(origin)に、同じ削除で消える投稿のidを記録しておく(pre_deleteはすべてのpost_deleteより先に送られる)
+@receiver(pre_delete, sender=Post)
+def mark_post_deleting(sender, instance, origin=None, **kwargs):
+    if origin is not None:
+        origin.__dict__.setdefault('_deleting_post_ids', set()).add(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_post(sender, instance, origin=None, **kwargs):
+    if instance.post_id in getattr(origin, '_deleting_post_ids', ()):
+        return
+    record_comment_deleted(instance)
@@ -0,0 +1,176 @@
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def count_key(name, pk):
+    return f'paginator:count:{name}:{pk}'
+
+
+class KeysetPage:
+    """
+    キーセットページネーションの1ページ分
+    総件数を数えないため、ページ番号や最後のページは持たない
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_token=None, previous_token=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    並び順のキー(既定は更新日時とid)の値で続きを取得するページネーター
+    OFFSETとCOUNT(*)を使わないため、深いページでも1ページ目と同じコストで取得できる
+    前後のページへのトークンは署名付きで、クライアントからは中身を扱わない
+    """
+
+    salt = 'app.paginators.KeysetPaginator'
+
+    def __init__(self, queryset, per_page, ordering=('-updated_at', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def encode_token(self, obj, direction):
+        values = [
+            self.queryset.model._meta.get_field(field).value_to_string(obj)
+            for field in self.fields
+        ]
+        return signing.dumps({'d': direction, 'v': values}, salt=self.salt)
+
+    def decode_token(self, token):
+        """
+        トークンを(向き, キーの値)に戻す。不正なトークンは None を返す
+        """
+        try:
+            data = signing.loads(token, salt=self.salt)
+            direction, values = data['d'], data['v']
+            if direction not in ('next', 'previous') or len(values) != len(self.fields):
+                return None
+            values = [
+                self.queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            return None
+        return direction, values
+
+    def seek_filter(self, values, backward):
+        # (a, b) < (x, y) を a < x OR (a = x AND b < y) に展開する
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith('-') != backward
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{self.fields[i]}__{lookup}': values[i]})
+            for name, value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{name: value})
+            condition |= step
+        return condition
+
+    def reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def page(self, token=None):
+        """
+        トークンに対応するページを返す。トークンがない・不正な場合は最初のページ
+        """
+        cursor = self.decode_token(token) if token else None
+
+        if cursor is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        elif cursor[0] == 'next':
+            queryset = self.queryset.filter(self.seek_filter(cursor[1], backward=False))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        else:
+            # 前のページは逆順に取得して並べ直す
+            queryset = self.queryset.filter(self.seek_filter(cursor[1], backward=True))
+            rows = list(queryset.order_by(*self.reversed_ordering())[:self.per_page + 1])
+            has_next, has_previous = True, len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+
+        if not rows and cursor is not None:
+            # 削除などで続きがなくなったトークンは最初のページとして扱う
+            return self.page()
+
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_token=self.encode_token(rows[-1], 'next') if has_next else None,
+            previous_token=self.encode_token(rows[0], 'previous') if has_previous else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    ListViewのページネーションをキーセット方式に置き換える
+    ページは ?cursor=<トークン> で指定する
+    """
+
+    paginator_class = KeysetPaginator
+    cursor_kwarg = 'cursor'
+    ordering = ('-updated_at', '-id')
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.paginator_class(queryset, page_size, ordering=self.get_ordering())
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class CachedCountPaginator(Paginator):
+    """
+    総件数をキャッシュするページネーター
+    cache_key ごとに COUNT(*) の結果を PAGINATOR_COUNT_TTL 秒まで使い回す
+    (件数が変わる操作ではシグナルでキーを削除する)
+    count を渡した場合は、非正規化した件数などとしてそのまま使う
+    """
+
+    def __init__(self, object_list, per_page, cache_key=None, timeout=None, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+        self.timeout = settings.PAGINATOR_COUNT_TTL if timeout is None else timeout
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.cache_key is None:
+            return Paginator.count.func(self)
+
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = Paginator.count.func(self)
+            cache.set(self.cache_key, count, self.timeout)
+        return count
@@ -0,0 +1,180 @@
+import bisect
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from app.models.book_models import Book
+from app.models.post_models import Post
+from app.services.book_services import normalize_query
+
+
+class PrefixIndex:
+    """
+    ソート済みの配列と二分探索による前方一致の索引
+    各語の先頭からも一致するよう、語の位置ごとに(正規化した文字列, 表示用の文字列)を保持する
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._texts = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._texts)
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._texts = set()
+
+    def add(self, text):
+        text = (text or '').strip()
+        with self._lock:
+            if not text or text in self._texts:
+                return
+            self._texts.add(text)
+            for key in self.keys(text):
+                bisect.insort(self._entries, (key, text))
+
+    def extend(self, texts):
+        with self._lock:
+            for text in texts:
+                text = (text or '').strip()
+                if not text or text in self._texts:
+                    continue
+                self._texts.add(text)
+                self._entries.extend((key, text) for key in self.keys(text))
+            self._entries.sort()
+
+    @staticmethod
+    def keys(text):
+        words = normalize_query(text).split()
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def search(self, prefix, limit=10):
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        with self._lock:
+            i = bisect.bisect_left(self._entries, (prefix,))
+            while i < len(self._entries) and len(results) < limit:
+                key, text = self._entries[i]
+                if not key.startswith(prefix):
+                    break
+                if text not in results:
+                    results.append(text)
+                i += 1
+        return results
+
+
+class BookAutocomplete:
+    """
+    カタログと投稿済みの本のタイトル・著者名の索引(ワーカープロセスごとに保持する)
+    - 本・投稿の追加は共有キャッシュの追加分の記録から、各ワーカーの索引に差分で反映する
+    - 変更・削除で共有キャッシュの版が変わった場合と、AUTOCOMPLETE_TTL秒を過ぎた場合は作り直す
+    - 作り直しは1スレッドのみが行い、他のスレッドはその間も今の索引で検索する
+    """
+
+    version_key = 'autocomplete:version'
+    added_key = 'autocomplete:added'
+
+    def __init__(self):
+        self.indexes = {'title': PrefixIndex(), 'author': PrefixIndex()}
+        self.version = None
+        self.added = 0
+        self.built_at = None
+        self._lock = threading.Lock()
+        self._add_lock = threading.Lock()
+
+    def added_entry_key(self, number):
+        return f'{self.added_key}:{number}'
+
+    def shared_state(self):
+        state = cache.get_many([self.version_key, self.added_key])
+        return state.get(self.version_key, 0), state.get(self.added_key, 0)
+
+    def is_fresh(self, version):
+        return (
+            self.built_at is not None
+            and self.version == version
+            and time.monotonic() - self.built_at < settings.AUTOCOMPLETE_TTL
+        )
+
+    def build(self, version, added):
+        title, author = PrefixIndex(), PrefixIndex()
+        title.extend(Book.objects.values_list('title', flat=True).iterator())
+        title.extend(Post.objects.values_list('book_title', flat=True).iterator())
+        author.extend(Book.objects.values_list('author', flat=True).iterator())
+        author.extend(Post.objects.values_list('author', flat=True).iterator())
+        with self._add_lock:
+            # 作成中の追加分は、次の検索で差分として反映する
+            self.indexes = {'title': title, 'author': author}
+            self.version = version
+            self.added = added
+            self.built_at = time.monotonic()
+
+    def apply_additions(self, added):
+        with self._add_lock:
+            if added <= self.added:
+                return
+            numbers = range(self.added + 1, added + 1)
+            entries = cache.get_many([self.added_entry_key(number) for number in numbers])
+            for number in numbers:
+                entry = entries.get(self.added_entry_key(number))
+                # 書き込み途中の追加分は次の検索で読み直す(期限切れの分は作り直しで反映される)
+                if entry is None:
+                    break
+                self.indexes['title'].add(entry[0])
+                self.indexes['author'].add(entry[1])
+                self.added = number
+
+    def refresh(self):
+        version, added = self.shared_state()
+        if self.built_at is None:
+            # 初回は索引がないため、作成を待つ
+            with self._lock:
+                if self.built_at is None:
+                    self.build(version, added)
+        elif not self.is_fresh(version) and self._lock.acquire(blocking=False):
+            try:
+                self.build(version, added)
+            finally:
+                self._lock.release()
+        self.apply_additions(added)
+
+    def add(self, title, author):
+        """
+        追加された本・投稿のタイトル・著者名を全ワーカーの索引に差分で反映させる
+        """
+        try:
+            number = cache.incr(self.added_key)
+        except ValueError:
+            cache.add(self.added_key, 0, timeout=None)
+            number = cache.incr(self.added_key)
+        cache.set(self.added_entry_key(number), (title, author), timeout=settings.AUTOCOMPLETE_TTL)
+
+    def invalidate(self):
+        """
+        全ワーカーの索引を次の検索時に作り直させる
+        """
+        if not cache.add(self.version_key, 1, timeout=None):
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.add(self.version_key, 1, timeout=None)
+
+    def reset(self):
+        with self._lock, self._add_lock:
+            self.indexes = {'title': PrefixIndex(), 'author': PrefixIndex()}
+            self.version = None
+            self.added = 0
+            self.built_at = None
+
+    def search(self, field, prefix, limit=10):
+        self.refresh()
+        return self.indexes[field].search(prefix, limit)
+
+
+book_autocomplete = BookAutocomplete()
@@ -0,0 +1,283 @@
+import hashlib
+import unicodedata
+from django.conf import settings
+from django.utils import timezone
+from app.models.book_models import Book
+from app.models.post_models import Post
+from app.services.cache_services import TwoTierCache
+from app.services.rakuten_services import get_api_data, run_in_api_executor
+from app.services.ratelimit_services import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_PREFETCH
+from app.services.record_services import BookRecord, parse_items, SEARCH_ELEMENTS, DETAIL_ELEMENTS
+
+
+isbn_cache = TwoTierCache(
+    prefix='isbn',
+    maxsize=settings.ISBN_CACHE_MAXSIZE,
+    ttl=settings.ISBN_CACHE_TTL,
+    stale_ttl=settings.ISBN_CACHE_STALE_TTL,
+    negative_ttl=settings.ISBN_CACHE_NEGATIVE_TTL,
+)
+
+# 楽天ブックスAPIで取得できるページの上限
+SEARCH_MAX_PAGE = 100
+
+search_cache = TwoTierCache(
+    prefix='search',
+    maxsize=settings.SEARCH_CACHE_MAXSIZE,
+    ttl=settings.SEARCH_CACHE_TTL,
+    stale_ttl=settings.SEARCH_CACHE_STALE_TTL,
+    negative_ttl=settings.SEARCH_CACHE_NEGATIVE_TTL,
+)
+
+
+def book_defaults(record):
+    return {
+        'title': record.title,
+        'author': record.author,
+        'sales_date': record.sales_date,
+        'publisher_name': record.publisher_name,
+        'item_caption': record.item_caption,
+        'small_image_url': record.small_image_url,
+        'medium_image_url': record.medium_image_url,
+        'large_image_url': record.large_image_url,
+        'item_url': record.item_url,
+        'review_average': record.review_average,
+        'review_count': record.review_count,
+        'fetched_at': timezone.now(),
+    }
+
+
+def save_book(record):
+    book, _ = Book.objects.update_or_create(
+        isbn=record.isbn,
+        defaults=book_defaults(record),
+    )
+    return book
+
+
+async def asave_book(record):
+    book, _ = await Book.objects.aupdate_or_create(
+        isbn=record.isbn,
+        defaults=book_defaults(record),
+    )
+    return book
+
+
+def fetch_isbn_records(isbn, deadline=None, priority=PRIORITY_HIGH):
+    params = {
+        'isbn': isbn,
+        'elements': ','.join(DETAIL_ELEMENTS),
+    }
+    items = get_api_data(params, priority=priority, deadline=deadline)
+    if items is None:
+        return None
+
+    return parse_items(items[:1])
+
+
+def lookup_isbn(isbn, deadline=None):
+    """
+    ISBNでAPIの検索結果を取得する
+    BookRecordのリストを返し、該当なしの場合は空のリスト、APIに失敗した場合はNoneを返す
+    """
+    return isbn_cache.get_or_fetch(
+        isbn,
+        lambda: fetch_isbn_records(isbn, deadline),
+        # バックグラウンドの更新は、利用者を待たせる取得のための予約分のトークンを使わない
+        refresh=lambda: fetch_isbn_records(isbn, priority=PRIORITY_LOW),
+    )
+
+
+def summary_key(isbn):
+    return f'{isbn}:summary'
+
+
+def seed_isbn_cache(records):
+    """
+    検索結果(タイトル・著者名・画像のみ)をISBNごとにキャッシュし、続く新規投稿画面でAPIを呼び出さずに済むようにする
+    詳細情報ではないため、lookup_isbnとは別のキーに保存する
+    """
+    isbn_cache.set_many({
+        summary_key(record.isbn): [record] for record in records if record.isbn
+    })
+
+
+def store_book(isbn, records):
+    """
+    APIから取得した本の情報でISBNのキャッシュとカタログを更新する
+    該当なしの場合はBook.DoesNotExistを送出する
+    """
+    isbn_cache.set(isbn, records)
+    if not records:
+        raise Book.DoesNotExist(isbn)
+
+    return save_book(records[0])
+
+
+def normalize_query(value):
+    """
+    全角・半角、連続する空白、大文字・小文字の違いを吸収する
+    """
+    value = unicodedata.normalize('NFKC', value or '')
+    return ' '.join(value.split()).casefold()
+
+
+def search_key(title, author, hits, page=1):
+    return hashlib.sha1(f'{title}\n{author}\n{hits}\n{page}'.encode()).hexdigest()
+
+
+def fetch_search_results(title, author, hits, page=1, deadline=None, priority=PRIORITY_LOW):
+    params = {
+        'title': title,
+        'hits': hits,
+        'page': page,
+        'elements': ','.join(SEARCH_ELEMENTS),
+    }
+    if author:
+        params['author'] = author
+
+    items = get_api_data(params=params, priority=priority, deadline=deadline)
+    if items is None:
+        return None
+
+    records = parse_items(items)
+    seed_isbn_cache(records)
+    return records
+
+
+def has_next_page(records, hits, page):
+    return records is not None and len(records) >= hits and page < SEARCH_MAX_PAGE
+
+
+async def aprefetch_search_page(title, author, hits, page):
+    """
+    次のページの検索結果をバックグラウンドで取得し、検索結果のキャッシュに入れておく
+    利用者の検索に使うトークンを減らさないよう、待たずに取れる場合のみAPIを呼び出す
+    """
+    key = search_key(title, author, hits, page)
+    if await search_cache.aget_entry(key) is not None:
+        return
+    search_cache.refresh_in_background(
+        key,
+        lambda: fetch_search_results(title, author, hits, page, priority=PRIORITY_PREFETCH),
+    )
+
+
+def search_local_books(title, author='', limit=30):
+    """
+    APIを利用できない場合の検索
+    カタログと投稿済みの本(タイトル・著者名)から、すべての語を含む本を返す
+    """
+    books = Book.objects.all()
+    posts = Post.objects.exclude(isbn='')
+    for word in normalize_query(title).split():
+        books = books.filter(title__icontains=word)
+        posts = posts.filter(book_title__icontains=word)
+    for word in normalize_query(author).split():
+        books = books.filter(author__icontains=word)
+        posts = posts.filter(author__icontains=word)
+
+    records = [
+        BookRecord(
+            isbn=book.isbn,
+            title=book.title,
+            author=book.author,
+            small_image_url=book.small_image_url,
+            medium_image_url=book.medium_image_url,
+            large_image_url=book.large_image_url,
+        )
+        for book in books.order_by('-review_count', 'title')[:limit]
+    ]
+
+    # カタログにない本は投稿に保存されたタイトル・著者名を使う
+    found = {record.isbn for record in records}
+    for isbn, book_title, book_author in (
+        posts.order_by('-updated_at').values_list('isbn', 'book_title', 'author')[:limit * 10]
+    ):
+        if len(records) >= limit:
+            break
+        if isbn in found:
+            continue
+        found.add(isbn)
+        records.append(BookRecord(isbn=isbn, title=book_title, author=book_author))
+    return records
+
+
+# 非同期ビュー用。APIの呼び出しはrun_in_api_executorのスレッドプールで、DBへのアクセスは非同期のORMで行う
+
+async def alookup_isbn(isbn, deadline=None):
+    return await isbn_cache.aget_or_fetch(
+        isbn,
+        lambda: run_in_api_executor(fetch_isbn_records, isbn, deadline),
+        refresh=lambda: fetch_isbn_records(isbn, priority=PRIORITY_LOW),
+    )
+
+
+async def afetch_book(isbn, deadline=None):
+    records = await alookup_isbn(isbn, deadline)
+    if records is None:
+        return None
+
+    if not records:
+        raise Book.DoesNotExist(isbn)
+
+    return await asave_book(records[0])
+
+
+async def aget_book(isbn, book=None, deadline=None):
+    """
+    ISBNに対応する本をカタログから取得する
+    未登録、または情報が古い場合のみAPIに問い合わせてカタログを更新する
+    APIに失敗した場合はNone(古い情報があればそれ)を返し、該当なしの場合はBook.DoesNotExistを送出する
+    """
+    if book is None:
+        book = await Book.objects.filter(isbn=isbn).afirst()
+
+    if book is not None and not book.is_stale():
+        return book
+
+    try:
+        fetched = await afetch_book(isbn, deadline)
+    except Book.DoesNotExist:
+        if book is not None:
+            return book
+        raise
+
+    return fetched or book
+
+
+async def aget_book_summary(isbn, deadline=None):
+    """
+    新規投稿画面で表示する本の情報(タイトル・著者名・画像)を取得する
+    カタログ、ISBNのキャッシュ、検索結果のキャッシュの順に探し、いずれにもない場合のみaget_bookでAPIに問い合わせる
+    """
+    book = await Book.objects.filter(isbn=isbn).afirst()
+    if book is not None and not book.is_stale():
+        return book
+
+    for key in (isbn, summary_key(isbn)):
+        records = await isbn_cache.apeek(key)
+        if records:
+            return records[0]
+
+    return await aget_book(isbn, book=book, deadline=deadline)
+
+
+async def asearch_books(title, author='', hits=30, page=1, deadline=None, prefetch=False):
+    """
+    タイトル・著者名で本を検索する
+    正規化したクエリ・ページ単位で検索結果をキャッシュし、APIに失敗した場合はNoneを返す
+    prefetch=Trueの場合は、続きがあれば次のページをバックグラウンドで取得しておく
+    """
+    title = normalize_query(title)
+    author = normalize_query(author)
+    key = search_key(title, author, hits, page)
+
+    records = await search_cache.aget_or_fetch(
+        key,
+        lambda: run_in_api_executor(fetch_search_results, title, author, hits, page, deadline),
+        refresh=lambda: fetch_search_results(title, author, hits, page),
+    )
+    if prefetch and has_next_page(records, hits, page):
+        await aprefetch_search_page(title, author, hits, page + 1)
+    return records
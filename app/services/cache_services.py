@@ -0,0 +1,256 @@
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import caches
+
+
+class LRUCache:
+    """
+    ワーカープロセス内で共有するLRUキャッシュ
+    上限件数を超えた場合は最も古く参照されたエントリから破棄する
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class TwoTierCache:
+    """
+    プロセス内LRUとDjangoのキャッシュ(ワーカー間で共有)の2段構成のキャッシュ
+    - ttl秒を過ぎたエントリはstale_ttl秒の間、バックグラウンドで更新しつつ古い値を返す
+    - 空の値(該当なし)はnegative_ttl秒だけ保持する
+    - fetchがNoneを返した場合(取得失敗)はキャッシュしない
+    """
+
+    def __init__(self, prefix, maxsize, ttl, stale_ttl, negative_ttl, cache_alias='default'):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_alias = cache_alias
+        self.local = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._refreshing = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def needs_shared(self, entry):
+        return entry is None or entry[1] <= time.time()
+
+    def merge_entry(self, cache_key, entry, shared_entry):
+        # 他のワーカーが更新済みであれば共有キャッシュの値を使う
+        if shared_entry is not None and (entry is None or shared_entry[1] > entry[1]):
+            entry = shared_entry
+            self.local.set(cache_key, entry)
+        if entry is None:
+            return None
+
+        value, fresh_until, expires_at = entry
+        if expires_at <= time.time():
+            self.local.delete(cache_key)
+            return None
+        return entry
+
+    def get_entry(self, key):
+        cache_key = self.make_key(key)
+        entry = self.local.get(cache_key)
+        shared_entry = self.shared.get(cache_key) if self.needs_shared(entry) else None
+        return self.merge_entry(cache_key, entry, shared_entry)
+
+    async def aget_entry(self, key):
+        """
+        get_entryの非同期版。共有キャッシュにはaget()でアクセスし、イベントループを止めない
+        """
+        cache_key = self.make_key(key)
+        entry = self.local.get(cache_key)
+        shared_entry = await self.shared.aget(cache_key) if self.needs_shared(entry) else None
+        return self.merge_entry(cache_key, entry, shared_entry)
+
+    def peek(self, key):
+        """
+        キャッシュにある値のみを返す(APIからの取得やバックグラウンドの更新は行わない)
+        ない場合・空の値の場合はNoneを返し、見つかった場合はヒットとして数える
+        """
+        return self.count_peek(self.get_entry(key))
+
+    async def apeek(self, key):
+        return self.count_peek(await self.aget_entry(key))
+
+    def count_peek(self, entry):
+        if entry is None or not entry[0]:
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def make_entry(self, value, now):
+        if value:
+            fresh_until = now + self.ttl
+            expires_at = fresh_until + self.stale_ttl
+        else:
+            fresh_until = expires_at = now + self.negative_ttl
+        return (value, fresh_until, expires_at)
+
+    def set(self, key, value):
+        now = time.time()
+        cache_key = self.make_key(key)
+        entry = self.make_entry(value, now)
+        self.local.set(cache_key, entry)
+        self.shared.set(cache_key, entry, timeout=max(1, int(entry[2] - now)))
+
+    async def aset(self, key, value):
+        now = time.time()
+        cache_key = self.make_key(key)
+        entry = self.make_entry(value, now)
+        self.local.set(cache_key, entry)
+        await self.shared.aset(cache_key, entry, timeout=max(1, int(entry[2] - now)))
+
+    def set_many(self, values):
+        """
+        空でない値をまとめて書き込む(共有キャッシュへの書き込みは1回にまとめる)
+        """
+        now = time.time()
+        entries = {}
+        for key, value in values.items():
+            if not value:
+                continue
+            cache_key = self.make_key(key)
+            entries[cache_key] = self.make_entry(value, now)
+            self.local.set(cache_key, entries[cache_key])
+        if entries:
+            self.shared.set_many(entries, timeout=max(1, int(self.ttl + self.stale_ttl)))
+
+    def delete(self, key):
+        cache_key = self.make_key(key)
+        self.local.delete(cache_key)
+        self.shared.delete(cache_key)
+
+    def clear(self):
+        self.local.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, key, fetch, refresh=None):
+        entry = self.get_entry(key)
+        if entry is not None:
+            self.hits += 1
+            value, fresh_until, _ = entry
+            if fresh_until <= time.time():
+                self.refresh_in_background(key, refresh or fetch)
+            return value
+
+        self.misses += 1
+        value = fetch()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    async def aget_or_fetch(self, key, fetch, refresh):
+        """
+        get_or_fetchの非同期版
+        fetchはコルーチン関数、refreshはバックグラウンドのスレッドで実行する同期関数を渡す
+        """
+        entry = await self.aget_entry(key)
+        if entry is not None:
+            self.hits += 1
+            value, fresh_until, _ = entry
+            if fresh_until <= time.time():
+                self.refresh_in_background(key, refresh)
+            return value
+
+        self.misses += 1
+        value = await fetch()
+        if value is not None:
+            await self.aset(key, value)
+        return value
+
+    def refresh_in_background(self, key, fetch):
+        # 共有キャッシュへのアクセスはすべてスレッドの中で行い、呼び出し元(イベントループ)を止めない
+        with self._lock:
+            if key in self._refreshing:
+                return
+            thread = threading.Thread(
+                target=self._refresh,
+                args=(key, fetch),
+                daemon=True,
+            )
+            self._refreshing[key] = thread
+        thread.start()
+
+    def _refresh(self, key, fetch):
+        try:
+            # 複数ワーカーで同じキーを同時に更新しないよう、共有キャッシュでロックを取る
+            lock_key = self.make_key(f'{key}:refresh')
+            if not self.shared.add(lock_key, 1, timeout=60):
+                return
+            try:
+                value = fetch()
+                if value is not None:
+                    self.set(key, value)
+            finally:
+                self.shared.delete(lock_key)
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def wait_for_refresh(self, timeout=None):
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'local': self.local.stats(),
+        }
@@ -0,0 +1,68 @@
+import threading
+import time
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    連続してfailure_threshold回失敗した場合に遮断(open)し、reset_timeout秒の間は呼び出しを行わない
+    reset_timeout秒経過後は1回だけ試行(half_open)し、成功すれば復帰(closed)する
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def is_open(self):
+        with self._lock:
+            return (
+                self.state == STATE_OPEN
+                and time.monotonic() - self.opened_at < self.reset_timeout
+            )
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = STATE_HALF_OPEN
+
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        # 成功・失敗のどちらとも判断できずに終えた試行は、次の呼び出しで改めて試行させる
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
@@ -0,0 +1,64 @@
+from django.db.models import F, Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from app.models.comment_models import Comment
+from app.models.post_models import Post
+
+
+def comment_stats(field):
+    """
+    投稿ごとのコメント数(count)・最終コメント日時(latest)のサブクエリ
+    """
+    comments = Comment.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id')
+    if field == 'count':
+        return Coalesce(Subquery(comments.annotate(count=Count('pk')).values('count')), Value(0))
+    return Subquery(comments.annotate(latest=Max('created_at')).values('latest'))
+
+
+def record_comment_added(comment):
+    """
+    コメントの追加を投稿のコメント数・最終コメント日時に反映する
+    コメントの保存と同じトランザクションで呼び出す
+    """
+    created_at = Value(comment.created_at)
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_commented_at=Greatest(Coalesce('last_commented_at', created_at), created_at),
+    )
+
+
+def record_comment_deleted(comment):
+    """
+    コメントの削除を投稿のコメント数・最終コメント日時に反映する
+    コメントの削除と同じトランザクションで呼び出す
+    """
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, Value(0)),
+        last_commented_at=comment_stats('latest'),
+    )
+
+
+def reconcile_comment_counts(posts=None, dry_run=False, batch_size=500):
+    """
+    コメント数・最終コメント日時が実際のコメントとずれている投稿を数え直す
+    ずれていた投稿のidを返す
+    """
+    if posts is None:
+        posts = Post.objects.all()
+
+    drifted = [
+        post.pk
+        for post in posts.annotate(
+            actual_count=comment_stats('count'),
+            actual_latest=comment_stats('latest'),
+        ).only('pk', 'comment_count', 'last_commented_at').order_by('pk').iterator()
+        if post.comment_count != post.actual_count or post.last_commented_at != post.actual_latest
+    ]
+
+    if not dry_run:
+        # 読み取りから書き込みまでの間に追加されたコメントも含めるよう、UPDATE文の中で数え直す
+        for start in range(0, len(drifted), batch_size):
+            Post.objects.filter(pk__in=drifted[start:start + batch_size]).update(
+                comment_count=comment_stats('count'),
+                last_commented_at=comment_stats('latest'),
+            )
+    return drifted
@@ -0,0 +1,141 @@
+import os
+import re
+import tempfile
+from io import BytesIO
+import requests
+from PIL import Image
+from django.conf import settings
+from app.models.book_models import Book
+from app.services.book_services import isbn_cache, summary_key
+from app.services.singleflight_services import SingleFlight
+from app.services.rakuten_services import RakutenBooksClient
+
+# 表示する場所ごとの画像の大きさ(この大きさに収まるよう縮小する)
+COVER_VARIANTS = {
+    'thumb': (120, 120),
+    'list': (200, 200),
+    'modal': (300, 300),
+}
+COVER_FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+ISBN_PATTERN = re.compile(r'[0-9]{9}[0-9X]|[0-9]{13}')
+
+cover_flight = SingleFlight(prefix='cover')
+
+# 表紙画像のホスト用。APIのホストとは接続プールを分け、互いの接続を追い出さないようにする
+cover_client = RakutenBooksClient(
+    url=None,
+    pool_maxsize=settings.RAKUTEN_API_POOL_MAXSIZE,
+    connect_timeout=settings.RAKUTEN_API_CONNECT_TIMEOUT,
+    read_timeout=settings.RAKUTEN_API_READ_TIMEOUT,
+)
+
+
+def is_valid_isbn(isbn):
+    return ISBN_PATTERN.fullmatch(isbn) is not None
+
+
+def cover_path(isbn, variant, fmt):
+    return os.path.join(settings.BOOK_COVER_ROOT, isbn[-3:], isbn, f'{variant}.{fmt}')
+
+
+def cover_sources(isbn):
+    """
+    大きさごとの表紙画像の取得元をカタログ、ISBNのキャッシュの順に探す
+    APIの画像(小・中・大)のうち、一辺が表示する大きさ以上で最も小さいものを使う
+    取得元が分かった大きさのみを {大きさ: URL} で返す
+    """
+    candidates = []
+    book = Book.objects.filter(isbn=isbn).first()
+    if book is not None:
+        candidates.append(book)
+    for key in (isbn, summary_key(isbn)):
+        records = isbn_cache.peek(key)
+        if records:
+            candidates.append(records[0])
+
+    sources = {}
+    for variant, size in COVER_VARIANTS.items():
+        for candidate in candidates:
+            url = candidate.image_url(max(size))
+            if url:
+                sources[variant] = url
+                break
+    return sources
+
+
+def read_cover(path):
+    """
+    保存した表紙画像を読み込む。未作成の場合はNoneを返す
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def save_cover_variants(isbn, variants, content):
+    """
+    取得した画像を大きさごとに縮小し、全ての形式で保存する
+    """
+    with Image.open(BytesIO(content)) as source:
+        source = source.convert('RGB')
+        for variant in variants:
+            image = source.copy()
+            image.thumbnail(COVER_VARIANTS[variant], Image.LANCZOS)
+            for fmt, (pil_format, _) in COVER_FORMATS.items():
+                write_atomic(cover_path(isbn, variant, fmt), image, pil_format)
+
+
+def write_atomic(path, image, pil_format):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, pil_format, quality=settings.BOOK_COVER_QUALITY)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def fetch_cover(isbn, url, variants):
+    try:
+        response = cover_client.session.get(url, timeout=cover_client.timeout)
+    except requests.exceptions.RequestException:
+        return False
+    if response.status_code != 200:
+        return False
+
+    try:
+        save_cover_variants(isbn, variants, response.content)
+    except (OSError, Image.DecompressionBombError):
+        return False
+    return True
+
+
+def get_cover(isbn, variant, fmt, sources=None):
+    """
+    表紙画像のファイルのパスを返す。未作成の場合は取得元から取得して作成する
+    同じ取得元を使う大きさは1回の取得でまとめて作成する
+    取得元が分からない、または取得に失敗した場合はNoneを返す
+    """
+    path = cover_path(isbn, variant, fmt)
+    if os.path.exists(path):
+        return path
+
+    if sources is None:
+        sources = cover_sources(isbn)
+    url = sources.get(variant)
+    if not url:
+        return None
+
+    # 同じ画像を同時に取得しないよう、取得元ごとに1回の取得にまとめる
+    variants = [name for name, source in sources.items() if source == url]
+    if not cover_flight.do(url, lambda: fetch_cover(isbn, url, variants)):
+        return None
+    return path
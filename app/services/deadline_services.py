@@ -0,0 +1,19 @@
+import time
+
+
+class Deadline:
+    """
+    1リクエストの中で上流の呼び出しに使える残り時間
+    """
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def limit(self, seconds):
+        return min(seconds, self.remaining())
@@ -0,0 +1,189 @@
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TITLE_WORDS = [
+    'Python', 'Django', '入門', '実践', 'データ', '設計', 'アルゴリズム', '経営',
+    '歴史', '物語', '料理', '旅', '猫', '宇宙', '経済', '心理学',
+]
+PUBLISHERS = ['テスト出版', 'サンプル書房', 'ダミー社', '架空文庫']
+
+
+def isbn13(number):
+    digits = f'978{number:09d}'
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def build_catalog(size, seed=0):
+    """
+    決定的に生成した架空の本の一覧(APIのItemと同じ形式)
+    """
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(size):
+        isbn = isbn13(i)
+        title = ' '.join(rng.sample(TITLE_WORDS, 2)) + f' {i}'
+        catalog.append({
+            'title': title,
+            'author': f'著者{i % 50}',
+            'isbn': isbn,
+            'salesDate': f'{2000 + i % 25}年{i % 12 + 1:02d}月',
+            'publisherName': PUBLISHERS[i % len(PUBLISHERS)],
+            'itemCaption': f'{title}の説明文です。' * 5,
+            'smallImageUrl': f'https://example.com/{isbn}.jpg?_ex=64x64',
+            'mediumImageUrl': f'https://example.com/{isbn}.jpg?_ex=120x120',
+            'largeImageUrl': f'https://example.com/{isbn}.jpg?_ex=200x200',
+            'itemUrl': f'https://example.com/books/{isbn}/',
+            'itemPrice': 1000 + i % 30 * 100,
+            'reviewAverage': f'{rng.randint(0, 50) / 10:.1f}',
+            'reviewCount': rng.randint(0, 500),
+        })
+    return catalog
+
+
+@dataclass
+class FaultConfig:
+    """
+    障害の注入設定
+    - latency / jitter: 応答までの遅延(秒)
+    - rate_429 / rate_5xx / rate_timeout: それぞれを返す確率(0〜1)
+    - timeout_seconds: タイムアウトを起こす場合に応答を止める秒数
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    rate_timeout: float = 0.0
+    timeout_seconds: float = 30.0
+
+
+class FakeRakutenServer:
+    """
+    楽天ブックス書籍検索API(BooksBook/Search)の代わりに使うローカルサーバー
+    isbn / title / author / hits / page / elements に対応する
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, catalog_size=1000, faults=None, seed=0):
+        self.catalog = build_catalog(catalog_size, seed)
+        self.faults = faults or FaultConfig()
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/services/api/BooksBook/Search/20170404?'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def random(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def search(self, query):
+        isbn = query.get('isbn')
+        title = query.get('title', '').casefold()
+        author = query.get('author', '').casefold()
+        hits = min(max(int(query.get('hits', 30)), 1), 30)
+        page = max(int(query.get('page', 1)), 1)
+
+        if isbn:
+            matched = [item for item in self.catalog if item['isbn'] == isbn]
+        else:
+            matched = [
+                item for item in self.catalog
+                if title in item['title'].casefold() and author in item['author'].casefold()
+            ]
+
+        start = (page - 1) * hits
+        items = matched[start:start + hits]
+
+        elements = query.get('elements')
+        if elements:
+            fields = elements.split(',')
+            items = [{k: item[k] for k in fields if k in item} for item in items]
+
+        return {
+            'count': len(matched),
+            'page': page,
+            'first': start + 1 if items else 0,
+            'last': start + len(items),
+            'hits': len(items),
+            'pageCount': (len(matched) + hits - 1) // hits,
+            'Items': [{'Item': item} for item in items],
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                faults = server.faults
+
+                delay = faults.latency + faults.jitter * server.random()
+                if delay:
+                    time.sleep(delay)
+
+                if server.random() < faults.rate_timeout:
+                    time.sleep(faults.timeout_seconds)
+                    return
+                if server.random() < faults.rate_429:
+                    return self.send_json(429, {'error': 'too_many_requests'})
+                if server.random() < faults.rate_5xx:
+                    return self.send_json(503, {'error': 'service_unavailable'})
+
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                if not query.get('applicationId'):
+                    return self.send_json(400, {'error': 'wrong_parameter'})
+                if not (query.get('isbn') or query.get('title') or query.get('author')):
+                    return self.send_json(400, {'error': 'wrong_parameter'})
+
+                try:
+                    body = server.search(query)
+                except ValueError:
+                    return self.send_json(400, {'error': 'wrong_parameter'})
+                self.send_json(200, body)
+
+            def send_json(self, status, body):
+                content = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                try:
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class Hedger:
+    """
+    応答が遅いリクエストに対して同じリクエストをもう1回送り、先に成功した応答を使う
+    - percentile: 直近の応答時間のこのパーセンタイルを過ぎても応答がない場合に重複リクエストを送る
+    - max_ratio: 重複リクエストの上限(全リクエストに対する割合)
+    - min_samples: 応答時間がこの件数たまるまでは重複リクエストを送らない
+    - window: 閾値の計算に使う直近の応答時間の件数
+    - max_workers: 元のリクエストと重複リクエストを実行するスレッド数(呼び出し元の同時実行数の2倍を目安にする)
+    - log_every: このリクエスト数ごとに stats() をログに出力する(0の場合は出力しない)
+    """
+
+    def __init__(self, percentile=95, max_ratio=0.05, min_samples=20, window=200,
+                 min_delay=0.05, max_workers=10, log_every=100):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.log_every = log_every
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.hedged = 0
+            self.hedge_wins = 0
+            self.skipped = 0
+            self._latencies.clear()
+
+    def record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def threshold(self):
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return max(self.min_delay, latencies[index])
+
+    def run(self, fn, acquire=None, timeout=None):
+        """
+        fnを実行し、閾値を過ぎても応答がない場合はacquire()が許可した場合のみもう1回実行する
+        timeout: これ以上待てない残り時間(閾値がこれを超える場合は重複リクエストを送らない)
+        残り時間内に応答がない場合は concurrent.futures.TimeoutError を送出する
+        """
+        with self._lock:
+            self.requests += 1
+            count = self.requests
+        if self.log_every and count % self.log_every == 0:
+            logger.info('hedged requests: %s', self.stats())
+
+        threshold = self.threshold()
+        if threshold is None or (timeout is not None and threshold >= timeout):
+            return self._timed(fn)
+
+        expires_at = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if expires_at is None else max(0.0, expires_at - time.monotonic())
+
+        # スレッドの空き待ちの時間は閾値に含めず、実行が始まってから計る
+        started = threading.Event()
+        primary = self._executor.submit(self._timed, fn, started)
+        if not started.wait(remaining()) and primary.cancel():
+            raise TimeoutError()
+
+        try:
+            return primary.result(timeout=threshold)
+        except TimeoutError:
+            pass
+
+        if not self._allow_hedge() or (acquire is not None and not acquire()):
+            with self._lock:
+                self.skipped += 1
+            return primary.result(timeout=remaining())
+
+        with self._lock:
+            self.hedged += 1
+        hedge = self._executor.submit(self._timed, fn)
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError()
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+        return primary.result()
+
+    def _allow_hedge(self):
+        with self._lock:
+            return self.hedged + 1 <= self.requests * self.max_ratio
+
+    def _timed(self, fn, started_event=None):
+        if started_event is not None:
+            started_event.set()
+        started = time.monotonic()
+        result = fn()
+        self.record(time.monotonic() - started)
+        return result
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'skipped': self.skipped,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+            'threshold': self.threshold(),
+        }
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from app.models.comment_models import Comment
+from app.paginators import CachedCountPaginator
+from app.services.book_services import asave_book, lookup_isbn
+from app.services.deadline_services import Deadline
+from app.services.rakuten_services import api_executor
+
+logger = logging.getLogger(__name__)
+
+
+def paginate_comments(post, page, per_page=5):
+    comment_list = Comment.objects.filter(post_id=post.pk).order_by('-created_at')
+    # 総件数は投稿に持たせたコメント数を使い、COUNT(*)を発行しない
+    paginator = CachedCountPaginator(comment_list, per_page, count=post.comment_count)
+
+    try:
+        return paginator.page(page)
+    except PageNotAnInteger:
+        return paginator.page(1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+
+
+async def aassemble_post_detail(post, page, wait=None):
+    """
+    投稿詳細ページに表示する本の情報とコメントを取得する
+    カタログにない(または古い)本はコメントの取得と並行してAPIに問い合わせ、
+    コメントの取得後wait秒以内に取得できた場合のみ埋め込む(間に合わない場合はモーダルを開いた時に取得する)
+    古い情報は、取得できなかった場合にそのまま表示する
+    待つ間もイベントループを止めないよう、非同期ビューから呼び出す
+    """
+    if wait is None:
+        wait = settings.POST_DETAIL_BOOK_WAIT
+
+    book = post.book
+    lookup = None
+    if book is None or book.is_stale():
+        # スレッドではAPIとキャッシュのみを扱い、DBへの書き込みは非同期のORMで行う
+        # 間に合わなかった場合もスレッドでの取得は続け、結果をキャッシュに入れる
+        deadline = Deadline(settings.RAKUTEN_API_DEADLINE)
+        lookup = asyncio.wrap_future(api_executor.submit(lookup_isbn, post.isbn, deadline))
+
+    comment_data = await sync_to_async(paginate_comments)(post, page)
+
+    if lookup is not None:
+        try:
+            records = await asyncio.wait_for(asyncio.shield(lookup), timeout=wait)
+        except asyncio.TimeoutError:
+            records = None
+        except Exception:
+            # 本の情報は必須ではないため、取得に失敗してもページは表示する
+            logger.exception('本の情報の取得に失敗しました。')
+            records = None
+        if records:
+            book = await asave_book(records[0])
+
+    return {
+        'book_data': book,
+        'comment_data': comment_data,
+    }
@@ -0,0 +1,213 @@
+from django.conf import settings
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from app.services.singleflight_services import SingleFlight
+from app.services.ratelimit_services import TokenBucket, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_PREFETCH
+from app.services.circuit_services import CircuitBreaker
+from app.services.hedge_services import Hedger
+
+api_key = settings.API_KEY
+
+api_url = settings.RAKUTEN_API_URL
+
+
+class RakutenBooksClient:
+    """
+    楽天ブックスAPIのクライアント
+    keep-aliveの接続プールをワーカープロセスごとに保持し、再利用する
+    (表紙画像のホストにはurlを指定せず、sessionのみを使う別のインスタンスを用意する)
+    """
+
+    def __init__(self, url, pool_maxsize, connect_timeout, read_timeout):
+        self.url = url
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # gunicornのfork後に親プロセスのソケットを共有しないよう、pidごとに作り直す
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._create_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def timeout_for(self, deadline=None):
+        if deadline is None:
+            return self.timeout
+        return tuple(deadline.limit(t) for t in self.timeout)
+
+    def get(self, params, deadline=None):
+        return self.session.get(self.url, params=params, timeout=self.timeout_for(deadline))
+
+
+# api_executorの全スレッドが同時に呼び出しても、接続を捨てずに再利用できる大きさにする
+client = RakutenBooksClient(
+    url=api_url,
+    pool_maxsize=max(settings.RAKUTEN_API_POOL_MAXSIZE, settings.RAKUTEN_API_ASYNC_WORKERS),
+    connect_timeout=settings.RAKUTEN_API_CONNECT_TIMEOUT,
+    read_timeout=settings.RAKUTEN_API_READ_TIMEOUT,
+)
+
+
+api_flight = SingleFlight(
+    prefix='rakuten',
+    shared=settings.RAKUTEN_API_SINGLEFLIGHT_SHARED,
+    lock_timeout=settings.RAKUTEN_API_CONNECT_TIMEOUT + settings.RAKUTEN_API_READ_TIMEOUT,
+    wait_timeout=settings.RAKUTEN_API_CONNECT_TIMEOUT + settings.RAKUTEN_API_READ_TIMEOUT,
+)
+
+
+rate_limiter = TokenBucket(
+    rate=settings.RAKUTEN_API_RATE,
+    capacity=settings.RAKUTEN_API_BURST,
+    reserve=settings.RAKUTEN_API_RESERVE,
+    max_wait={
+        PRIORITY_HIGH: settings.RAKUTEN_API_MAX_WAIT_HIGH,
+        PRIORITY_LOW: settings.RAKUTEN_API_MAX_WAIT_LOW,
+        PRIORITY_PREFETCH: 0,
+    },
+    backend=settings.RAKUTEN_API_RATE_LIMIT_BACKEND,
+    lock_file=settings.RAKUTEN_API_RATE_LIMIT_FILE,
+    prefix='rakuten:ratelimit',
+)
+
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.RAKUTEN_API_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.RAKUTEN_API_CIRCUIT_RESET_TIMEOUT,
+)
+
+
+# ISBN検索(高優先度)の応答が遅い場合に重複リクエストを送る。重複分は低優先度のトークンを待たずに取れる場合のみ送る
+hedger = Hedger(
+    percentile=settings.RAKUTEN_API_HEDGE_PERCENTILE,
+    max_ratio=settings.RAKUTEN_API_HEDGE_MAX_RATIO,
+    min_samples=settings.RAKUTEN_API_HEDGE_MIN_SAMPLES,
+    # api_executorの全スレッドが元のリクエストと重複リクエストを同時に実行できる数
+    max_workers=settings.RAKUTEN_API_ASYNC_WORKERS * 2,
+) if settings.RAKUTEN_API_HEDGE else None
+
+
+# 非同期ビューからのAPI呼び出しはこのスレッドプールで実行し、イベントループを止めない
+# 接続プール・レート制限・遮断・同時リクエストのまとめは同期版と共有する
+# requestsはスレッドを占有するため、プロセスごとの同時呼び出しはRAKUTEN_API_ASYNC_WORKERSまでになる
+api_executor = ThreadPoolExecutor(
+    max_workers=settings.RAKUTEN_API_ASYNC_WORKERS,
+    thread_name_prefix='rakuten',
+)
+
+
+async def run_in_api_executor(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(api_executor, functools.partial(fn, *args, **kwargs))
+
+
+def get_api_data(params, priority=PRIORITY_HIGH, deadline=None):
+    params['format'] = 'json'
+    params['applicationId'] = api_key
+
+    # 遮断中はAPIを呼び出さず、呼び出し元でキャッシュやカタログの情報を使う
+    if circuit_breaker.is_open():
+        return None
+
+    # 同じパラメータの同時リクエストは1回のAPI呼び出しにまとめる
+    key = urlencode(sorted(params.items()))
+    return api_flight.do(
+        key,
+        lambda: request_api_data(params, priority, deadline),
+        timeout=deadline.remaining() if deadline is not None else None,
+    )
+
+
+def send_request(params, priority=PRIORITY_HIGH, deadline=None):
+    if hedger is None or priority != PRIORITY_HIGH:
+        return client.get(params, deadline=deadline)
+
+    try:
+        return hedger.run(
+            lambda: client.get(params, deadline=deadline),
+            acquire=lambda: rate_limiter.acquire(PRIORITY_LOW, timeout=0),
+            timeout=deadline.remaining() if deadline is not None else None,
+        )
+    except TimeoutError:
+        raise requests.exceptions.Timeout()
+
+
+def too_little_time(deadline):
+    # 残り時間がわずかな場合は、応答を待てないリクエストを送らない
+    return deadline is not None and deadline.remaining() < settings.RAKUTEN_API_MIN_TIMEOUT
+
+
+def request_api_data(params, priority=PRIORITY_HIGH, deadline=None):
+    # 429を受けた場合はバケットを空にして、トークンを待てる範囲で1回だけ再試行する
+    for _ in range(2):
+        if too_little_time(deadline):
+            return None
+
+        timeout = None if deadline is None else deadline.limit(rate_limiter.max_wait.get(priority, 0))
+        if not rate_limiter.acquire(priority, timeout=timeout):
+            return None
+
+        if too_little_time(deadline):
+            return None
+
+        if not circuit_breaker.allow_request():
+            return None
+
+        waited = min(client.timeout_for(deadline))
+        try:
+            api_response = send_request(params, priority, deadline)
+        except requests.exceptions.Timeout:
+            # 残り時間がわずかで短くなったタイムアウトは、上流の障害として数えない
+            if waited >= min(settings.RAKUTEN_API_CIRCUIT_MIN_TIMEOUT, *client.timeout):
+                circuit_breaker.record_failure()
+            else:
+                circuit_breaker.release()
+            return None
+        except requests.exceptions.RequestException:
+            circuit_breaker.record_failure()
+            return None
+        except Exception:
+            circuit_breaker.release()
+            raise
+
+        if api_response.status_code >= 500:
+            circuit_breaker.record_failure()
+            return None
+        circuit_breaker.record_success()
+
+        if api_response.status_code != 429:
+            break
+        rate_limiter.drain()
+
+    if api_response.status_code != 200:
+        return None
+
+    # 壊れた応答は取得失敗として扱う
+    try:
+        result = api_response.json()
+        api_data = result['Items']
+    except (ValueError, KeyError, TypeError):
+        return None
+    return api_data
@@ -0,0 +1,120 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from django.core.cache import caches
+
+PRIORITY_HIGH = 'high'
+PRIORITY_LOW = 'low'
+# 先読みなど、使われない可能性のあるリクエスト。トークンを待たず、空きがある場合のみ送る
+PRIORITY_PREFETCH = 'prefetch'
+
+
+class TokenBucket:
+    """
+    ワーカープロセス間で共有するトークンバケット
+    - rate: 1秒あたりに補充するトークン数
+    - capacity: バケットの上限(バースト許容量)
+    - reserve: 優先度の低いリクエストが使えない、高優先度用に残しておくトークン数
+    - max_wait: 優先度ごとのトークン待ちの上限秒数(待っても取得できない場合のみ拒否する)
+    backend='file'の場合はファイルロック、'cache'の場合はDjangoのキャッシュで状態を共有する
+    """
+
+    def __init__(self, rate, capacity, reserve=0, max_wait=None, backend='file',
+                 lock_file=None, cache_alias='default', prefix='ratelimit'):
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = reserve
+        self.max_wait = max_wait or {PRIORITY_HIGH: 0, PRIORITY_LOW: 0}
+        self.backend = backend
+        self.lock_file = lock_file
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.waited = 0
+        self.rejected = 0
+        self._thread_lock = threading.Lock()
+
+    def acquire(self, priority=PRIORITY_HIGH, timeout=None):
+        if timeout is None:
+            timeout = self.max_wait.get(priority, 0)
+        deadline = time.monotonic() + timeout
+
+        while True:
+            wait = self._take(priority)
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                self.rejected += 1
+                return False
+            self.waited += 1
+            time.sleep(wait)
+
+    def drain(self):
+        """
+        上流でレート制限(429)を受けた場合に、全ワーカーのトークンを空にする
+        """
+        with self._state() as state:
+            state['tokens'] = 0.0
+            state['updated_at'] = time.time()
+
+    def _take(self, priority):
+        with self._state() as state:
+            now = time.time()
+            elapsed = max(0.0, now - state['updated_at'])
+            state['tokens'] = min(self.capacity, state['tokens'] + elapsed * self.rate)
+            state['updated_at'] = now
+
+            needed = 1 + (self.reserve if priority != PRIORITY_HIGH else 0)
+            if state['tokens'] >= needed:
+                state['tokens'] -= 1
+                return 0
+            return (needed - state['tokens']) / self.rate
+
+    def _initial_state(self):
+        return {'tokens': float(self.capacity), 'updated_at': time.time()}
+
+    @contextmanager
+    def _state(self):
+        if self.backend == 'cache':
+            with self._cache_state() as state:
+                yield state
+        else:
+            with self._file_state() as state:
+                yield state
+
+    @contextmanager
+    def _file_state(self):
+        with self._thread_lock:
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'r+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(f.read())
+                    except ValueError:
+                        state = self._initial_state()
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _cache_state(self):
+        cache = caches[self.cache_alias]
+        lock_key = f'{self.prefix}:lock'
+        state_key = f'{self.prefix}:state'
+
+        with self._thread_lock:
+            while not cache.add(lock_key, 1, timeout=5):
+                time.sleep(0.005)
+            try:
+                state = cache.get(state_key) or self._initial_state()
+                yield state
+                cache.set(state_key, state, timeout=None)
+            finally:
+                cache.delete(lock_key)
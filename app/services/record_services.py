@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from app.models.book_models import select_image_url
+
+# APIに要求する項目(elements)。呼び出し元ごとに必要な項目だけを取得する
+SEARCH_ELEMENTS = (
+    'title',
+    'author',
+    'isbn',
+    'smallImageUrl',
+    'mediumImageUrl',
+    'largeImageUrl',
+)
+DETAIL_ELEMENTS = (
+    'title',
+    'author',
+    'isbn',
+    'salesDate',
+    'publisherName',
+    'itemCaption',
+    'smallImageUrl',
+    'mediumImageUrl',
+    'largeImageUrl',
+    'itemUrl',
+    'reviewAverage',
+    'reviewCount',
+)
+
+
+@dataclass(slots=True)
+class BookRecord:
+    """
+    APIの検索結果(Item)1件分
+    属性名はBookモデルと揃えており、テンプレートではどちらも同じように扱える
+    """
+    isbn: str
+    title: str = ''
+    author: str = ''
+    sales_date: str = ''
+    publisher_name: str = ''
+    item_caption: str = ''
+    small_image_url: str = ''
+    medium_image_url: str = ''
+    large_image_url: str = ''
+    item_url: str = ''
+    review_average: str = ''
+    review_count: int = 0
+
+    def image_url(self, size):
+        return select_image_url(self, size)
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(
+            isbn=item['isbn'],
+            title=item.get('title', ''),
+            author=item.get('author', ''),
+            sales_date=item.get('salesDate', ''),
+            publisher_name=item.get('publisherName', ''),
+            item_caption=item.get('itemCaption', ''),
+            small_image_url=item.get('smallImageUrl', ''),
+            medium_image_url=item.get('mediumImageUrl', ''),
+            large_image_url=item.get('largeImageUrl', ''),
+            item_url=item.get('itemUrl', ''),
+            review_average=str(item.get('reviewAverage', '')),
+            review_count=int(item.get('reviewCount') or 0),
+        )
+
+
+def parse_items(items):
+    return [BookRecord.from_item(i['Item']) for i in items]
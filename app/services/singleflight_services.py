@@ -0,0 +1,89 @@
+import hashlib
+import threading
+import time
+from django.core.cache import caches
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    同じキーに対する同時実行をまとめ、1回の実行結果を待機中の呼び出し元で共有する
+    shared=Trueの場合はDjangoのキャッシュをロックに使い、ワーカープロセス間でもまとめる
+    """
+
+    def __init__(self, prefix, shared=False, lock_timeout=10, wait_timeout=10,
+                 poll_interval=0.05, cache_alias='default'):
+        self.prefix = prefix
+        self.shared = shared
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.cache_alias = cache_alias
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        wait_timeout = self.wait_timeout if timeout is None else min(self.wait_timeout, timeout)
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.event.wait(wait_timeout):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.shared:
+                call.result = self._do_shared(key, fn, wait_timeout)
+            else:
+                call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def _do_shared(self, key, fn, wait_timeout):
+        cache = caches[self.cache_alias]
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        lock_key = f'{self.prefix}:lock:{digest}'
+        result_key = f'{self.prefix}:result:{digest}'
+
+        if cache.add(lock_key, 1, timeout=self.lock_timeout):
+            try:
+                result = fn()
+                cache.set(result_key, (result,), timeout=self.lock_timeout)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        # 他のワーカーが実行中の場合は結果が共有されるまで待つ
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            shared_result = cache.get(result_key)
+            if shared_result is not None:
+                self.coalesced += 1
+                return shared_result[0]
+            if cache.get(lock_key) is None:
+                break
+            time.sleep(self.poll_interval)
+        return fn()
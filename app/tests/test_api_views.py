@@ -1,10 +1,22 @@
 import os
+import time
 import unittest
 from unittest.mock import patch
-from app.views.api_views import api_url, get_api_data
+import requests
+from app.services.rakuten_services import api_url, get_api_data, client, rate_limiter, circuit_breaker
+from app.services.circuit_services import STATE_CLOSED, STATE_HALF_OPEN
+from app.services.deadline_services import Deadline
+from app.services.fake_rakuten_services import FakeRakutenServer, FaultConfig
 
 class GetApiDataViewTests(unittest.TestCase):
-    @patch('app.views.api_views.requests.get')
+    def setUp(self):
+        patcher = patch.object(rate_limiter, 'acquire', return_value=True)
+        self.mock_acquire = patcher.start()
+        self.addCleanup(patcher.stop)
+        circuit_breaker.reset()
+        self.addCleanup(circuit_breaker.reset)
+
+    @patch('app.services.rakuten_services.requests.Session.get')
     def test_34_get_api_data_success(self, mock_get):
         """
         APIにアクセスし、レスポンスが正常値であった場合
@@ -27,9 +39,9 @@ class GetApiDataViewTests(unittest.TestCase):
             'format': 'json',
             'applicationId': os.getenv('API_KEY')
         }
-        mock_get.assert_called_once_with(api_url, params=expected_params)
+        mock_get.assert_called_once_with(api_url, params=expected_params, timeout=client.timeout)
 
-    @patch('app.views.api_views.requests.get')
+    @patch('app.services.rakuten_services.requests.Session.get')
     def test_35_get_api_data_faire(self, mock_get):
         """
         APIにアクセスし、レスポンスが異常値であった場合
@@ -48,9 +60,9 @@ class GetApiDataViewTests(unittest.TestCase):
             'format': 'json',
             'applicationId': os.getenv('API_KEY')
         }
-        mock_get.assert_called_once_with(api_url, params=expected_params)
+        mock_get.assert_called_once_with(api_url, params=expected_params, timeout=client.timeout)
 
-    @patch('app.views.api_views.requests.get')
+    @patch('app.services.rakuten_services.requests.Session.get')
     def test_36_get_api_data_empty_params(self, mock_get):
         """
         APIにアクセスし、入力パラメータがblankであった場合
@@ -70,7 +82,176 @@ class GetApiDataViewTests(unittest.TestCase):
             'format': 'json',
             'applicationId': os.getenv('API_KEY')
         }
-        mock_get.assert_called_once_with(api_url, params=expected_params)
+        mock_get.assert_called_once_with(api_url, params=expected_params, timeout=client.timeout)
+
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_90_get_api_data_timeout(self, mock_get):
+        """
+        APIの応答がタイムアウトした場合
+        """
+        mock_get.side_effect = requests.exceptions.Timeout()
+
+        result = get_api_data({'isbn': '1234567890123'})
+
+        self.assertIsNone(result)
+
+    def test_91_session_is_reused(self):
+        """
+        同一プロセス内では同じセッション(接続プール)が再利用されることを確認
+        """
+        session = client.session
+        self.assertIs(session, client.session)
+
+        adapter = session.get_adapter(api_url)
+        self.assertEqual(adapter._pool_maxsize, client.pool_maxsize)
+        self.assertIsNotNone(client.timeout[0])
+        self.assertIsNotNone(client.timeout[1])
+
+    @patch.object(rate_limiter, 'drain')
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_104_get_api_data_retry_after_429(self, mock_get, mock_drain):
+        """
+        APIからレート制限(429)を受けた場合、トークンを待って1回だけ再試行することを確認
+        """
+        throttled = unittest.mock.Mock(status_code=429)
+        success = unittest.mock.Mock(status_code=200)
+        success.json.return_value = {'Items': [{'title': 'test_title'}]}
+        mock_get.side_effect = [throttled, success]
+
+        result = get_api_data({'title': 'test'})
+
+        self.assertEqual(result[0]['title'], 'test_title')
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(self.mock_acquire.call_count, 2)
+        mock_drain.assert_called_once()
+
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_105_get_api_data_rate_limited(self, mock_get):
+        """
+        トークンを取得できなかった場合、APIを呼び出さずにNoneを返すことを確認
+        """
+        self.mock_acquire.return_value = False
+
+        result = get_api_data({'title': 'test'})
+
+        self.assertIsNone(result)
+        mock_get.assert_not_called()
+
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_110_circuit_breaker_opens_after_failures(self, mock_get):
+        """
+        連続して失敗した場合に遮断され、APIを呼び出さずにNoneを返すことを確認
+        """
+        mock_get.side_effect = requests.exceptions.Timeout()
+
+        for _ in range(circuit_breaker.failure_threshold):
+            self.assertIsNone(get_api_data({'isbn': '1234567890123'}))
+        self.assertEqual(mock_get.call_count, circuit_breaker.failure_threshold)
+
+        self.assertIsNone(get_api_data({'isbn': '1234567890123'}))
+        self.assertEqual(mock_get.call_count, circuit_breaker.failure_threshold)
+
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_111_deadline_limits_timeout(self, mock_get):
+        """
+        リクエストの残り時間を超えないタイムアウトでAPIを呼び出し、期限切れの場合は呼び出さないことを確認
+        """
+        mock_response = unittest.mock.Mock(status_code=200)
+        mock_response.json.return_value = {'Items': []}
+        mock_get.return_value = mock_response
+
+        get_api_data({'isbn': '1234567890123'}, deadline=Deadline(1))
+        connect_timeout, read_timeout = mock_get.call_args.kwargs['timeout']
+        self.assertLessEqual(connect_timeout, 1)
+        self.assertLessEqual(read_timeout, 1)
+
+        mock_get.reset_mock()
+        self.assertIsNone(get_api_data({'isbn': '1234567890123'}, deadline=Deadline(0)))
+        mock_get.assert_not_called()
+
+
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_132_deadline_timeout_does_not_open_circuit(self, mock_get):
+        """
+        残り時間がわずかな場合はAPIを呼び出さず、残り時間で短くしたタイムアウトは遮断の失敗として数えないことを確認
+        """
+        self.assertIsNone(get_api_data({'isbn': '1234567890123'}, deadline=Deadline(0.01)))
+        mock_get.assert_not_called()
+
+        mock_get.side_effect = requests.exceptions.Timeout()
+        for _ in range(circuit_breaker.failure_threshold + 1):
+            self.assertIsNone(get_api_data({'isbn': '1234567890123'}, deadline=Deadline(1)))
+        self.assertFalse(circuit_breaker.is_open())
+        self.assertEqual(mock_get.call_count, circuit_breaker.failure_threshold + 1)
+
+    @patch('app.services.rakuten_services.requests.Session.get')
+    def test_136_deadline_timeout_opens_circuit_and_releases_trial(self, mock_get):
+        """
+        残り時間で短くしても十分に待ったタイムアウトは遮断の失敗として数え、
+        試行(half_open)中の短いタイムアウトでは次の呼び出しで改めて試行することを確認
+        """
+        mock_get.side_effect = requests.exceptions.Timeout()
+        for _ in range(circuit_breaker.failure_threshold):
+            self.assertIsNone(get_api_data({'isbn': '1234567890123'}, deadline=Deadline(2)))
+        self.assertTrue(circuit_breaker.is_open())
+
+        mock_response = unittest.mock.Mock(status_code=200)
+        mock_response.json.return_value = {'Items': []}
+        with patch('app.services.circuit_services.time.monotonic', return_value=time.monotonic() + 60):
+            self.assertIsNone(get_api_data({'isbn': '1234567890123'}, deadline=Deadline(0.5)))
+            self.assertEqual(circuit_breaker.state, STATE_HALF_OPEN)
+
+            mock_get.side_effect = None
+            mock_get.return_value = mock_response
+            self.assertEqual(get_api_data({'isbn': '1234567890123'}, deadline=Deadline(2)), [])
+        self.assertEqual(circuit_breaker.state, STATE_CLOSED)
+        self.assertEqual(mock_get.call_count, circuit_breaker.failure_threshold + 2)
+
+class FakeRakutenServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRakutenServer(catalog_size=100).start()
+        self.addCleanup(self.server.stop)
+        for patcher in (
+            patch.object(client, 'url', self.server.url),
+            patch.object(rate_limiter, 'acquire', return_value=True),
+            patch.object(rate_limiter, 'drain'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        circuit_breaker.reset()
+        self.addCleanup(circuit_breaker.reset)
+
+    def test_113_fake_server_search(self):
+        """
+        ローカルサーバーに対してISBN検索・タイトル検索ができ、elementsで項目が絞られることを確認
+        """
+        isbn = self.server.catalog[0]['isbn']
+        result = get_api_data({'isbn': isbn, 'elements': 'title,isbn'})
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]['Item'], {
+            'title': self.server.catalog[0]['title'],
+            'isbn': isbn,
+        })
+
+        result = get_api_data({'title': 'python', 'hits': 5})
+        self.assertLessEqual(len(result), 5)
+        for item in result:
+            self.assertIn('python', item['Item']['title'].casefold())
+
+    def test_114_fake_server_faults(self):
+        """
+        429・5xx・タイムアウトを注入した場合にNoneを返すことを確認
+        """
+        self.server.faults = FaultConfig(rate_429=1)
+        self.assertIsNone(get_api_data({'title': 'python'}))
+        self.assertEqual(self.server.requests, 2)
+
+        self.server.faults = FaultConfig(rate_5xx=1)
+        self.assertIsNone(get_api_data({'title': 'python'}))
+
+        self.server.faults = FaultConfig(rate_timeout=1, timeout_seconds=0.5)
+        self.assertIsNone(get_api_data({'title': 'python'}, deadline=Deadline(0.2)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+from io import StringIO
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from app.models.post_models import Post
+from app.models.book_models import Book
+from app.models.comment_models import Comment
+from app.services.book_services import isbn_cache
+from app.services.ratelimit_services import PRIORITY_LOW
+
+User = get_user_model()
+
+
+class WarmBookCatalogCommandTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        isbn_cache.clear()
+        user = User.objects.create_user(email='test@test.com', password='test0000')
+        for isbn in ['1111111111111', '2222222222222', '3333333333333', '3333333333333']:
+            Post.objects.create(
+                user=user,
+                post_title='test_post',
+                reason='test_reason',
+                impressions='test_impressions',
+                satisfaction=3,
+                book_title='test_title',
+                author='test_author',
+                isbn=isbn,
+            )
+        Book.objects.create(isbn='1111111111111', title='fresh')
+        Book.objects.create(
+            isbn='2222222222222',
+            title='stale',
+            fetched_at=timezone.now() - timedelta(days=30),
+        )
+
+    @patch('app.services.book_services.get_api_data')
+    def test_143_warm_missing_and_stale_books(self, mock_get_api_data):
+        """
+        カタログ未登録・情報が古い本のみを低優先度でAPIから取得し、カタログを更新することを確認
+        """
+        mock_get_api_data.side_effect = lambda params, **kwargs: [{
+            'Item': {'title': f'title_{params["isbn"]}', 'isbn': params['isbn']}
+        }]
+
+        call_command('warmbookcatalog', workers=2, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(mock_get_api_data.call_count, 2)
+        for call in mock_get_api_data.call_args_list:
+            self.assertEqual(call.kwargs['priority'], PRIORITY_LOW)
+        self.assertEqual(Book.objects.get(isbn='1111111111111').title, 'fresh')
+        self.assertEqual(Book.objects.get(isbn='2222222222222').title, 'title_2222222222222')
+        self.assertEqual(Book.objects.get(isbn='3333333333333').title, 'title_3333333333333')
+
+    @patch('app.management.commands.warmbookcatalog.time.sleep')
+    @patch('app.services.book_services.get_api_data')
+    def test_115_warm_retries_failed_requests(self, mock_get_api_data, mock_sleep):
+        """
+        APIに失敗した場合は再試行し、該当なしの本はカタログに登録しないことを確認
+        """
+        mock_get_api_data.side_effect = [None, [], None, None]
+
+        err = StringIO()
+        call_command('warmbookcatalog', workers=1, retries=1, stdout=StringIO(), stderr=err)
+
+        self.assertEqual(mock_get_api_data.call_count, 4)
+        self.assertFalse(Book.objects.filter(isbn='3333333333333').exists())
+        self.assertIn('2222222222222: not_found', err.getvalue())
+        self.assertIn('3333333333333: failed', err.getvalue())
+
+
+class ReconcileCommentCountsCommandTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(email='test@test.com', password='test0000')
+        self.posts = [
+            Post.objects.create(
+                user=user,
+                post_title=f'test_post{i}',
+                reason='test_reason',
+                impressions='test_impressions',
+                satisfaction=3,
+                book_title='test_title',
+                author='test_author',
+                isbn='1234567890123',
+            )
+            for i in range(3)
+        ]
+        # シグナルを通らない一括作成でコメント数をずらす
+        Comment.objects.bulk_create([
+            Comment(user=user, comment=f'comment{i}', post=self.posts[0])
+            for i in range(3)
+        ])
+        Comment.objects.create(user=user, comment='comment', post=self.posts[1])
+        Post.objects.filter(pk=self.posts[2].pk).update(comment_count=5, last_commented_at=timezone.now())
+
+    def test_131_reconcile_comment_counts(self):
+        """
+        ずれているコメント数・最終コメント日時のみが数え直されることを確認
+        """
+        out = StringIO()
+        call_command('reconcilecommentcounts', '--dry-run', stdout=out)
+        self.assertIn('2件', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).comment_count, 0)
+
+        out = StringIO()
+        call_command('reconcilecommentcounts', stdout=out)
+        self.assertIn('2件の投稿のコメント数を修正しました。', out.getvalue())
+
+        latest = Comment.objects.filter(post=self.posts[0]).order_by('-created_at').first()
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(post.comment_count, 3)
+        self.assertEqual(post.last_commented_at, latest.created_at)
+        self.assertEqual(Post.objects.get(pk=self.posts[1].pk).comment_count, 1)
+        post = Post.objects.get(pk=self.posts[2].pk)
+        self.assertEqual(post.comment_count, 0)
+        self.assertIsNone(post.last_commented_at)
+
+        out = StringIO()
+        call_command('reconcilecommentcounts', stdout=out)
+        self.assertIn('0件', out.getvalue())
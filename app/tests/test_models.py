@@ -1,8 +1,12 @@
 from django.test import TestCase
+from django.db import connection
 from django.contrib.auth import get_user_model
 from app.models.post_models import Post
 from django.core.exceptions import ValidationError
 from app.models.comment_models import Comment
+from app.models.book_models import Book
+from django.utils import timezone
+from datetime import timedelta
 
 User = get_user_model()
 
@@ -273,3 +277,141 @@ class CommentModelTests(TestCase):
             comment_data.full_clean()
         except ValidationError:
             self.fail('"comment: 正常値" のバリデーションに異常な挙動が発生')
+
+
+class BookModelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="main@test.com",
+            password="test0000"
+        )
+        cls.book = Book.objects.create(
+            isbn='1234567890123',
+            title='book_title',
+            author='author',
+        )
+
+    def test_92_post_references_book_by_isbn(self):
+        """
+        PostがISBNでBookを参照し、select_relatedで同時に取得できることを確認
+        """
+        Post.objects.create(
+            user=self.user,
+            post_title='post_title',
+            reason='reason',
+            impressions='impressions',
+            satisfaction=3,
+            book_title='book_title',
+            author='author',
+            isbn='1234567890123',
+        )
+        Post.objects.create(
+            user=self.user,
+            post_title='post_title',
+            reason='reason',
+            impressions='impressions',
+            satisfaction=3,
+            book_title='book_title',
+            author='author',
+            isbn='9999999999999',
+        )
+
+        with self.assertNumQueries(1):
+            posts = list(Post.objects.select_related('book').order_by('pk'))
+            self.assertEqual(posts[0].book, self.book)
+            self.assertIsNone(posts[1].book)
+
+        self.assertEqual(self.book.posts.count(), 1)
+
+    def test_93_is_stale(self):
+        """
+        取得日時がBOOK_CATALOG_TTLを超えた場合に古い情報と判定されることを確認
+        """
+        self.assertFalse(self.book.is_stale())
+
+        self.book.fetched_at = timezone.now() - timedelta(days=365)
+        self.assertTrue(self.book.is_stale())
+
+    def test_122_select_image_url_by_size(self):
+        """
+        表示する大きさに収まる最小の画像URLが選ばれることを確認
+        """
+        book = Book(
+            isbn='1234567890123',
+            small_image_url='http://example.com/small.jpg',
+            medium_image_url='http://example.com/medium.jpg',
+            large_image_url='http://example.com/large.jpg',
+        )
+        self.assertEqual(book.image_url(50), 'http://example.com/small.jpg')
+        self.assertEqual(book.image_url(100), 'http://example.com/medium.jpg')
+        self.assertEqual(book.image_url(200), 'http://example.com/large.jpg')
+        self.assertEqual(book.image_url(300), 'http://example.com/large.jpg')
+        self.assertEqual(Book(isbn='1234567890123').image_url(100), '')
+
+
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(email=f"index_user{i}@test.com", password="test0000")
+            for i in range(10)
+        ]
+        Post.objects.bulk_create([
+            Post(
+                user=users[i % len(users)],
+                post_title=f"post_title{i}",
+                reason="reason",
+                impressions="impressions",
+                satisfaction=i % 5 + 1,
+                book_title=f"book_title{i}",
+                author="author",
+                isbn=f"{i % 50:013d}",
+            )
+            for i in range(500)
+        ])
+        posts = list(Post.objects.order_by('pk')[:50])
+        Comment.objects.bulk_create([
+            Comment(user=users[i % len(users)], comment=f"comment{i}", post=posts[i % len(posts)])
+            for i in range(500)
+        ])
+        cls.user = users[0]
+        cls.post = posts[0]
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            # 件数が少ないとシーケンシャルスキャンが選ばれるため、インデックスを使えるかのみを確認する
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, plan)
+
+    def test_126_hot_queries_use_indexes(self):
+        """
+        投稿一覧・マイページ・プロフィール・ISBN検索・コメント一覧のクエリがインデックスを使うことを確認
+        """
+        self.assertUsesIndex(
+            Post.objects.order_by('-updated_at', '-id')[:5],
+            'posts_updated_at_idx',
+        )
+        self.assertUsesIndex(
+            Post.objects.filter(user=self.user).order_by('-updated_at', '-id')[:5],
+            'posts_user_updated_at_idx',
+        )
+        self.assertUsesIndex(
+            Post.objects.filter(user_id=self.user.pk).order_by('-created_at')[:5],
+            'posts_user_created_at_idx',
+        )
+        self.assertUsesIndex(
+            Post.objects.filter(isbn=self.post.isbn)[:5],
+            'posts_isbn_idx',
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(post_id=self.post.pk).order_by('-created_at')[:5],
+            'comments_post_created_at_idx',
+        )
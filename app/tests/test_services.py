@@ -0,0 +1,422 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from unittest.mock import patch, AsyncMock, Mock
+from django.test import TestCase
+from django.core.cache import cache
+from app.services.cache_services import LRUCache, TwoTierCache
+from app.services.book_services import isbn_cache, lookup_isbn
+from app.services.singleflight_services import SingleFlight
+from app.services.record_services import BookRecord, DETAIL_ELEMENTS
+from app.services.ratelimit_services import TokenBucket, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_PREFETCH
+from app.services.circuit_services import CircuitBreaker, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from app.services.deadline_services import Deadline
+from app.services.hedge_services import Hedger
+from app.services.autocomplete_services import PrefixIndex
+
+
+class LRUCacheTests(TestCase):
+
+    def test_96_evicts_least_recently_used(self):
+        """
+        上限件数を超えた場合、最も古く参照されたエントリが破棄されることを確認
+        """
+        lru = LRUCache(maxsize=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+        self.assertEqual(lru.stats()['hits'], 3)
+        self.assertEqual(lru.stats()['misses'], 1)
+
+
+class TwoTierCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache = TwoTierCache(
+            prefix='test',
+            maxsize=10,
+            ttl=60,
+            stale_ttl=600,
+            negative_ttl=5,
+        )
+
+    def test_97_hit_from_local_and_shared_tier(self):
+        """
+        一度取得した値はfetchを呼ばずに返し、他のワーカー(ローカル未保持)からも共有キャッシュで参照できることを確認
+        """
+        fetch = Mock(return_value={'title': 'test'})
+
+        self.assertEqual(self.cache.get_or_fetch('key', fetch), {'title': 'test'})
+        self.assertEqual(self.cache.get_or_fetch('key', fetch), {'title': 'test'})
+        fetch.assert_called_once()
+
+        self.cache.clear()
+        self.assertEqual(self.cache.get_or_fetch('key', fetch), {'title': 'test'})
+        fetch.assert_called_once()
+
+    def test_98_failure_is_not_cached_and_empty_is_negative_cached(self):
+        """
+        取得失敗(None)はキャッシュせず、該当なし(空)は短時間キャッシュすることを確認
+        """
+        fetch = Mock(return_value=None)
+        self.assertIsNone(self.cache.get_or_fetch('key', fetch))
+        self.assertIsNone(self.cache.get_or_fetch('key', fetch))
+        self.assertEqual(fetch.call_count, 2)
+
+        fetch = Mock(return_value={})
+        self.assertEqual(self.cache.get_or_fetch('empty', fetch), {})
+        self.assertEqual(self.cache.get_or_fetch('empty', fetch), {})
+        fetch.assert_called_once()
+
+        with patch('app.services.cache_services.time.time', return_value=time.time() + 10):
+            self.cache.get_or_fetch('empty', fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_99_stale_while_revalidate(self):
+        """
+        ttlを過ぎた値は古い値を返しつつ、バックグラウンドで更新されることを確認
+        """
+        self.cache.get_or_fetch('key', Mock(return_value={'title': 'old'}))
+
+        fetch = Mock(return_value={'title': 'new'})
+        with patch('app.services.cache_services.time.time', return_value=time.time() + 120):
+            self.assertEqual(self.cache.get_or_fetch('key', fetch), {'title': 'old'})
+            self.cache.wait_for_refresh()
+            self.assertEqual(self.cache.get_or_fetch('key', fetch), {'title': 'new'})
+        fetch.assert_called_once()
+
+
+    def test_135_peek_counts_hits(self):
+        """
+        peekはキャッシュにある空でない値のみを返し、見つかった場合のみヒットとして数えることを確認
+        """
+        self.assertIsNone(self.cache.peek('key'))
+        self.cache.set('empty', [])
+        self.assertIsNone(self.cache.peek('empty'))
+        self.assertEqual(self.cache.hits, 0)
+
+        self.cache.set('key', ['record'])
+        self.assertEqual(self.cache.peek('key'), ['record'])
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 0)
+
+    async def test_137_async_access_does_not_block_on_shared_tier(self):
+        """
+        非同期版は共有キャッシュに非同期のメソッド(aget/aset)でアクセスし、同期のメソッドを呼ばないことを確認
+        """
+        shared = Mock()
+        shared.get.side_effect = AssertionError('sync cache access')
+        shared.set.side_effect = AssertionError('sync cache access')
+        shared.aget = AsyncMock(return_value=None)
+        shared.aset = AsyncMock()
+
+        async def fetch():
+            return ['record']
+
+        with patch.object(TwoTierCache, 'shared', new=shared):
+            self.assertEqual(await self.cache.aget_or_fetch('key', fetch, refresh=Mock()), ['record'])
+            self.assertEqual(await self.cache.apeek('key'), ['record'])
+        shared.aget.assert_awaited_once_with('test:key')
+        shared.aset.assert_awaited_once()
+
+class LookupIsbnTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        isbn_cache.clear()
+
+    @patch('app.services.book_services.get_api_data')
+    def test_100_lookup_isbn(self, mock_get_api_data):
+        """
+        ISBNの検索結果が必要な項目のみ要求され、キャッシュによりAPIの呼び出しが1回になることを確認
+        """
+        mock_get_api_data.return_value = [{'Item': {'title': 'test', 'isbn': '1234567890123', 'reviewCount': 3}}]
+
+        for _ in range(3):
+            records = lookup_isbn('1234567890123')
+        self.assertEqual(records, [BookRecord(isbn='1234567890123', title='test', review_count=3)])
+        mock_get_api_data.assert_called_once_with(
+            {'isbn': '1234567890123', 'elements': ','.join(DETAIL_ELEMENTS)},
+            priority=PRIORITY_HIGH,
+            deadline=None,
+        )
+
+        # 古くなった値のバックグラウンドの更新は低優先度で行う
+        with patch('app.services.cache_services.time.time', return_value=time.time() + isbn_cache.ttl + 1):
+            lookup_isbn('1234567890123')
+            isbn_cache.wait_for_refresh()
+        self.assertEqual(mock_get_api_data.call_count, 2)
+        self.assertEqual(mock_get_api_data.call_args.kwargs['priority'], PRIORITY_LOW)
+
+        mock_get_api_data.return_value = []
+        self.assertEqual(lookup_isbn('0000000000000'), [])
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_102_concurrent_calls_are_coalesced(self):
+        """
+        同じキーの同時呼び出しが1回の実行にまとめられ、結果が共有されることを確認
+        """
+        flight = SingleFlight(prefix='test')
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ['result']
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+        leader.start()
+        started.wait(5)
+
+        followers = [
+            threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+            for _ in range(5)
+        ]
+        for thread in followers:
+            thread.start()
+        while flight.coalesced < 5:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['result']] * 6)
+
+        # 実行が完了した後の呼び出しは再度実行される
+        flight.do('key', fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_103_shared_result_across_workers(self):
+        """
+        他のワーカーが実行中の場合、共有キャッシュに保存された結果を受け取ることを確認
+        """
+        worker_a = SingleFlight(prefix='test', shared=True, poll_interval=0.01)
+        worker_b = SingleFlight(prefix='test', shared=True, poll_interval=0.01)
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch_a():
+            started.set()
+            release.wait(5)
+            return ['from_a']
+
+        fetch_b = Mock(return_value=['from_b'])
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(worker_a.do('key', fetch_a)))
+        thread.start()
+        started.wait(5)
+        threading.Timer(0.1, release.set).start()
+
+        self.assertEqual(worker_b.do('key', fetch_b), ['from_a'])
+        thread.join(5)
+        fetch_b.assert_not_called()
+        self.assertEqual(results, [['from_a']])
+
+
+class TokenBucketTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        fd, self.lock_file = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.lock_file)
+
+    def make_bucket(self, backend):
+        return TokenBucket(
+            rate=10,
+            capacity=3,
+            reserve=1,
+            max_wait={PRIORITY_HIGH: 0.5, PRIORITY_LOW: 0},
+            backend=backend,
+            lock_file=self.lock_file,
+            prefix='test:ratelimit',
+        )
+
+    def test_106_priority_and_smoothing(self):
+        """
+        低優先度は予約分のトークンを使えず、高優先度は補充を待って取得できることを確認
+        """
+        for backend in ['file', 'cache']:
+            bucket = self.make_bucket(backend)
+
+            self.assertTrue(bucket.acquire(PRIORITY_LOW))
+            self.assertTrue(bucket.acquire(PRIORITY_LOW))
+            # 残り1トークンは高優先度用
+            self.assertFalse(bucket.acquire(PRIORITY_LOW))
+            self.assertTrue(bucket.acquire(PRIORITY_HIGH))
+            # 空になっても補充を待って取得する
+            self.assertTrue(bucket.acquire(PRIORITY_HIGH))
+            self.assertEqual(bucket.waited, 1)
+            self.assertEqual(bucket.rejected, 1)
+
+    def test_140_prefetch_does_not_wait_or_use_reserve(self):
+        """
+        先読みは予約分のトークンを使わず、補充も待たずに拒否されることを確認
+        """
+        bucket = self.make_bucket('file')
+        bucket.max_wait = {PRIORITY_HIGH: 0.5, PRIORITY_LOW: 0.5, PRIORITY_PREFETCH: 0}
+
+        self.assertTrue(bucket.acquire(PRIORITY_PREFETCH))
+        self.assertTrue(bucket.acquire(PRIORITY_LOW))
+        self.assertFalse(bucket.acquire(PRIORITY_PREFETCH))
+        self.assertEqual(bucket.waited, 0)
+        self.assertTrue(bucket.acquire(PRIORITY_HIGH))
+
+    def test_107_state_is_shared_between_workers(self):
+        """
+        同じロックファイルを使うバケット同士でトークンが共有されることを確認
+        """
+        worker_a = self.make_bucket('file')
+        worker_b = self.make_bucket('file')
+
+        self.assertTrue(worker_a.acquire(PRIORITY_HIGH))
+        self.assertTrue(worker_a.acquire(PRIORITY_HIGH))
+        self.assertTrue(worker_a.acquire(PRIORITY_HIGH))
+        self.assertFalse(worker_b.acquire(PRIORITY_HIGH, timeout=0))
+
+        worker_b.drain()
+        self.assertFalse(worker_a.acquire(PRIORITY_LOW))
+
+
+class CircuitBreakerTests(TestCase):
+
+    def test_108_open_half_open_and_close(self):
+        """
+        連続した失敗で遮断し、一定時間後の試行が成功すれば復帰することを確認
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertTrue(breaker.is_open())
+        self.assertFalse(breaker.allow_request())
+
+        with patch('app.services.circuit_services.time.monotonic', return_value=time.monotonic() + 60):
+            self.assertFalse(breaker.is_open())
+            self.assertTrue(breaker.allow_request())
+            self.assertEqual(breaker.state, STATE_HALF_OPEN)
+            # 試行中は他の呼び出しを行わない
+            self.assertFalse(breaker.allow_request())
+            breaker.record_success()
+
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    def test_109_deadline(self):
+        """
+        残り時間を超えないようにタイムアウトが制限されることを確認
+        """
+        deadline = Deadline(1)
+        self.assertLessEqual(deadline.limit(5), 1)
+        self.assertEqual(deadline.limit(0.5), 0.5)
+        self.assertFalse(deadline.expired())
+
+        self.assertTrue(Deadline(0).expired())
+
+
+class HedgerTests(TestCase):
+
+    def test_118_hedge_slow_request(self):
+        """
+        応答時間が閾値を過ぎた場合に重複リクエストを送り、先に返った応答を使うことを確認
+        """
+        hedger = Hedger(percentile=90, max_ratio=1, min_samples=5, min_delay=0.01)
+        self.assertIsNone(hedger.threshold())
+        for _ in range(5):
+            self.assertEqual(hedger.run(lambda: 'fast'), 'fast')
+        self.assertEqual(hedger.threshold(), 0.01)
+
+        calls = []
+
+        def slow_once():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(1)
+                return 'slow'
+            return 'hedge'
+
+        started = time.monotonic()
+        self.assertEqual(hedger.run(slow_once), 'hedge')
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(hedger.stats()['hedged'], 1)
+        self.assertEqual(hedger.stats()['hedge_wins'], 1)
+
+    def test_119_hedge_rate_is_capped(self):
+        """
+        重複リクエストが上限の割合を超える場合や、トークンが取れない場合は送らないことを確認
+        """
+        hedger = Hedger(max_ratio=0.1)
+        slow = Mock(side_effect=lambda: time.sleep(0.03) or 'slow')
+
+        with patch.object(hedger, 'threshold', return_value=0.01):
+            for _ in range(9):
+                self.assertEqual(hedger.run(slow), 'slow')
+            # 9回目までは重複リクエストを送ると上限(10%)を超える
+            self.assertEqual(slow.call_count, 9)
+            self.assertEqual(hedger.stats()['hedged'], 0)
+
+            self.assertEqual(hedger.run(slow, acquire=lambda: False), 'slow')
+            self.assertEqual(slow.call_count, 10)
+
+            hedger.run(slow)
+            self.assertEqual(slow.call_count, 12)
+            self.assertEqual(hedger.stats()['hedged'], 1)
+            self.assertEqual(hedger.stats()['skipped'], 10)
+
+    def test_133_hedge_wait_is_bounded_and_logged(self):
+        """
+        重複リクエストを送らない場合も残り時間を超えて待たず、集計が定期的にログに出力されることを確認
+        """
+        hedger = Hedger(max_ratio=0, log_every=2)
+        slow = Mock(side_effect=lambda: time.sleep(0.5) or 'slow')
+
+        with patch.object(hedger, 'threshold', return_value=0.01):
+            started = time.monotonic()
+            with self.assertRaises(FuturesTimeoutError):
+                hedger.run(slow, timeout=0.1)
+            self.assertLess(time.monotonic() - started, 0.4)
+            self.assertEqual(hedger.stats()['skipped'], 1)
+
+            with self.assertLogs('app.services.hedge_services', level='INFO') as logs:
+                hedger.run(lambda: 'fast')
+        self.assertIn('hedge_rate', logs.output[0])
+
+
+class PrefixIndexTests(TestCase):
+
+    def test_123_prefix_search(self):
+        """
+        正規化した文字列の前方一致(各語の先頭からを含む)で候補を返すことを確認
+        """
+        index = PrefixIndex()
+        index.extend(['Python 入門', 'はじめての Python', 'Django 入門', ''])
+        index.add('Python 実践')
+        index.add('Python 入門')
+
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.search('ｐｙ'), ['はじめての Python', 'Python 入門', 'Python 実践'])
+        self.assertEqual(index.search('python 入'), ['Python 入門'])
+        self.assertEqual(index.search('入門'), ['Django 入門', 'Python 入門'])
+        self.assertEqual(index.search('py', limit=1), ['はじめての Python'])
+        self.assertEqual(index.search(' '), [])
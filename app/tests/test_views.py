@@ -1,12 +1,26 @@
+import tempfile
+import time
 import unittest
-from unittest.mock import patch
+from io import BytesIO
+from PIL import Image
+from unittest.mock import patch, ANY
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from app.models.post_models import Post
 from django.utils import timezone
 from django.contrib.messages import get_messages
 from app.models.comment_models import Comment
+from app.models.book_models import Book
+from datetime import timedelta
+from django.core.cache import cache
+from app.services.book_services import SEARCH_MAX_PAGE, isbn_cache, search_cache
+from app.services.ratelimit_services import PRIORITY_LOW, PRIORITY_PREFETCH
+from app.services.autocomplete_services import book_autocomplete
+from app.services.cover_services import cover_client
+from app.services.rakuten_services import client as api_client
 
 
 User = get_user_model()
@@ -16,6 +30,8 @@ class BookSearchViewTests(TestCase):
     def setUp(self):
         self.client = Client()
         self.book_search_url = reverse('app:book_search')
+        cache.clear()
+        search_cache.clear()
 
     def test_37_get_method(self):
         """
@@ -25,7 +41,7 @@ class BookSearchViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'app/book_form.html')
 
-    @patch('app.views.book_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_38_post_method_response_success_with_results(self, mock_get_api_data):
         """
         postメソッドにおいて、有効なフォームデータにより、APIが成功、かつ、結果がある場合
@@ -48,7 +64,7 @@ class BookSearchViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'app/book_list.html')
         self.assertContains(response, 'test_title', html=True)
-        self.assertIn('http://example.com/image.jpg', response.content.decode('utf-8'))
+        self.assertIn(reverse('app:book_cover', args=['1234567890', 'list', 'jpg']), response.content.decode('utf-8'))
 
         # input 'title' and 'author'
         response = self.client.post(
@@ -61,10 +77,10 @@ class BookSearchViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'app/book_list.html')
         self.assertContains(response, 'test_title test_authorの検索結果', html=True)
-        self.assertIn('http://example.com/image.jpg', response.content.decode('utf-8'))
+        self.assertIn(reverse('app:book_cover', args=['1234567890', 'list', 'jpg']), response.content.decode('utf-8'))
 
 
-    @patch('app.views.book_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_39_post_method_response_success_no_results(self, mock_get_api_data):
         """
         postメソッドにおいて、有効なフォームデータにより、APIが成功、かつ、結果がない場合
@@ -79,19 +95,23 @@ class BookSearchViewTests(TestCase):
         self.assertTemplateUsed(response, 'app/book_list.html')
         self.assertContains(response, '該当するものがありません', html=True)
 
-    @patch('app.views.book_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_40_post_method_response_failure(self, mock_get_api_data):
         """
         postメソッドにおいて、有効なフォームデータであるが、APIが失敗した場合
         """
         mock_get_api_data.side_effect = Exception("API call failed")
-        response = self.client.post(
-            self.book_search_url,
-            data={'title': 'test'}
-            )
-        self.assertEqual(response.status_code, 500)
+        with self.assertLogs('app.views.book_views', level='ERROR'):
+            response = self.client.post(
+                self.book_search_url,
+                data={'title': 'test'}
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'app/book_list.html')
+        self.assertTrue(response.context['degraded'])
+        self.assertNotContains(response, 'API call failed')
 
-    @patch('app.views.book_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_41_post_method_response_form_invalid(self, mock_get_api_data):
         """
         postメソッドにおいて、無効なフォームデータであった場合
@@ -103,6 +123,307 @@ class BookSearchViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'app/book_form.html')
 
+    @patch('app.services.book_services.get_api_data')
+    def test_101_search_results_are_cached_by_normalized_query(self, mock_get_api_data):
+        """
+        全角・半角、空白、大文字・小文字のみが異なる検索は、キャッシュした結果を返すことを確認
+        """
+        mock_get_api_data.return_value = [{
+            'Item': {
+                'title': 'test_title',
+                'author': 'test_author',
+                'isbn': '1234567890',
+                'largeImageUrl':'http://example.com/image.jpg'
+                }
+            }]
+
+        for title in ['Python 入門', 'ｐｙｔｈｏｎ　　入門', ' PYTHON 入門 ']:
+            response = self.client.post(
+                self.book_search_url,
+                data={'title': title}
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['book_data'][0].title, 'test_title')
+
+        mock_get_api_data.assert_called_once_with(
+            params={'title': 'python 入門', 'hits': 12, 'page': 1, 'elements': 'title,author,isbn,smallImageUrl,mediumImageUrl,largeImageUrl'},
+            priority=PRIORITY_LOW,
+            deadline=ANY,
+        )
+        self.assertEqual(search_cache.stats()['hits'], 2)
+        self.assertEqual(search_cache.stats()['misses'], 1)
+
+    @patch('app.services.book_services.get_api_data')
+    def test_142_search_results_seed_post_create_page(self, mock_get_api_data):
+        """
+        検索結果から選択した本の新規投稿画面は、APIを再度呼び出さずに表示されることを確認
+        """
+        User.objects.create_user(email='test@test.com', password='test0000')
+        self.client.login(email='test@test.com', password='test0000')
+        isbn_cache.clear()
+        mock_get_api_data.return_value = [{
+            'Item': {
+                'title': 'test_title',
+                'author': 'test_author',
+                'isbn': '1234567890123',
+                'largeImageUrl':'http://example.com/image.jpg'
+                }
+            }]
+
+        self.client.post(self.book_search_url, data={'title': 'test'})
+        response = self.client.get(reverse('app:post_new', args=['1234567890123']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'app/post_form.html')
+        self.assertEqual(response.context['book_data'].title, 'test_title')
+        self.assertEqual(response.context['book_data'].large_image_url, 'http://example.com/image.jpg')
+        mock_get_api_data.assert_called_once()
+
+    @patch('app.services.book_services.get_api_data')
+    async def test_116_async_search_and_create_login_required(self, mock_get_api_data):
+        """
+        ASGIで動作する非同期ビューとして検索でき、未ログインの場合は新規投稿画面からログイン画面へ遷移することを確認
+        """
+        mock_get_api_data.return_value = [{
+            'Item': {
+                'title': 'test_title',
+                'author': 'test_author',
+                'isbn': '1234567890123',
+                'largeImageUrl':'http://example.com/image.jpg'
+                }
+            }]
+
+        response = await self.async_client.post(self.book_search_url, data={'title': 'test'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['book_data'][0].title, 'test_title')
+
+        response = await self.async_client.get(reverse('app:post_new', args=['1234567890123']))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(f"next={reverse('app:post_new', args=['1234567890123'])}", response.url)
+
+    @patch('app.services.book_services.get_api_data')
+    def test_144_search_pages_are_prefetched(self, mock_get_api_data):
+        """
+        検索結果が1ページ分ある場合は次のページを先読みし、2ページ目以降をHTMLの断片として返すことを確認
+        """
+        def api_data(params, **kwargs):
+            count = 12 if params['page'] == 1 else 5
+            return [{
+                'Item': {
+                    'title': f'title_{params["page"]}_{i}',
+                    'isbn': f'{params["page"]}{i:012d}',
+                    }
+                } for i in range(count)]
+        mock_get_api_data.side_effect = api_data
+
+        response = self.client.post(self.book_search_url, data={'title': 'test'})
+        self.assertEqual(len(response.context['book_data']), 12)
+        next_url = response.context['next_url']
+        self.assertEqual(next_url, f"{reverse('app:book_search_page')}?title=test&page=2")
+        self.assertContains(response, 'id="bookSearchNext"')
+
+        search_cache.wait_for_refresh()
+        self.assertEqual(mock_get_api_data.call_count, 2)
+        # 先読みはトークンを待たずに取れる場合のみ行う
+        self.assertEqual(mock_get_api_data.call_args.kwargs['priority'], PRIORITY_PREFETCH)
+
+        response = self.client.get(next_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'app/book_list_page.html')
+        self.assertEqual(len(response.context['book_data']), 5)
+        self.assertIsNone(response.context['next_url'])
+        self.assertContains(response, 'title_2_0')
+        self.assertEqual(mock_get_api_data.call_count, 2)
+
+        response = self.client.get(reverse('app:book_search_page'), {'title': 'test', 'page': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+        # APIの上限を超えるページはAPIを呼び出さずに400を返す
+        response = self.client.get(
+            reverse('app:book_search_page'), {'title': 'test', 'page': SEARCH_MAX_PAGE + 1}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(mock_get_api_data.call_count, 2)
+
+    @patch('app.services.book_services.get_api_data')
+    def test_145_degraded_search_from_local_books(self, mock_get_api_data):
+        """
+        APIを利用できない場合は、カタログと投稿済みの本から検索することを確認
+        """
+        mock_get_api_data.return_value = None
+        user = User.objects.create_user(email='test@test.com', password='test0000')
+        Book.objects.create(isbn='1111111111111', title='Python 入門', author='山田 太郎')
+        Book.objects.create(isbn='2222222222222', title='Django 入門', author='山田 太郎')
+        for isbn, book_title in [('1111111111111', 'Python 入門'), ('3333333333333', 'はじめての Python')]:
+            Post.objects.create(
+                user=user,
+                post_title='test_post',
+                reason='test_reason',
+                impressions='test_impressions',
+                satisfaction=3,
+                book_title=book_title,
+                author='鈴木 花子',
+                isbn=isbn,
+            )
+
+        response = self.client.post(self.book_search_url, data={'title': 'ｐｙｔｈｏｎ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['degraded'])
+        self.assertEqual(
+            [book.isbn for book in response.context['book_data']],
+            ['1111111111111', '3333333333333'],
+        )
+        self.assertContains(response, '登録済みの本から検索しています')
+
+        response = self.client.post(self.book_search_url, data={'title': '入門', 'author': '山田'})
+        self.assertEqual(
+            sorted(book.isbn for book in response.context['book_data']),
+            ['1111111111111', '2222222222222'],
+        )
+
+        # 続きのページはAPIを利用できない旨を表示する
+        response = self.client.get(reverse('app:book_search_page'), {'title': 'python', 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['degraded'])
+        self.assertContains(response, '検索結果の続きを表示できません')
+        self.assertNotContains(response, 'bookSearchNext')
+
+
+class BookAutocompleteViewTests(TestCase):
+
+    def setUp(self):
+        book_autocomplete.reset()
+        self.addCleanup(book_autocomplete.reset)
+        self.url = reverse('app:book_autocomplete')
+
+    def test_124_autocomplete_from_local_books(self):
+        """
+        カタログと投稿済みの本から候補を返し、投稿の保存・削除に合わせて候補が更新されることを確認
+        """
+        user = User.objects.create_user(email='test@test.com', password='test0000')
+        Book.objects.create(isbn='1111111111111', title='Python 入門', author='山田 太郎')
+
+        response = self.client.get(self.url, {'q': 'py'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': ['Python 入門']})
+
+        post = Post.objects.create(
+            user=user,
+            post_title='test_post',
+            reason='test_reason',
+            impressions='test_impressions',
+            satisfaction=3,
+            book_title='Python 実践',
+            author='山本 花子',
+            isbn='2222222222222',
+        )
+        # 追加は索引を作り直さずに反映する
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'py'})
+        self.assertEqual(response.json(), {'results': ['Python 入門', 'Python 実践']})
+
+        # 変更がなければ索引を作り直さない
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'py'})
+
+        # 他のワーカーでの変更(共有キャッシュの版の更新)も反映する
+        Post.objects.filter(pk=post.pk).update(book_title='Python 応用')
+        book_autocomplete.invalidate()
+        response = self.client.get(self.url, {'q': 'py'})
+        self.assertEqual(response.json(), {'results': ['Python 入門', 'Python 応用']})
+
+        response = self.client.get(self.url, {'q': '山', 'field': 'author'})
+        self.assertEqual(response.json(), {'results': ['山本 花子', '山田 太郎']})
+
+        post.delete()
+        response = self.client.get(self.url, {'q': '山', 'field': 'author'})
+        self.assertEqual(response.json(), {'results': ['山田 太郎']})
+
+        response = self.client.get(self.url, {'q': 'py', 'field': 'isbn'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_138_autocomplete_rebuild_does_not_block_searches(self):
+        """
+        索引の作り直し中は、他のスレッドが今の索引で検索を続けることを確認
+        """
+        Book.objects.create(isbn='1111111111111', title='Python 入門', author='山田 太郎')
+        self.assertEqual(book_autocomplete.search('title', 'py'), ['Python 入門'])
+
+        book_autocomplete.invalidate()
+        with book_autocomplete._lock:
+            with self.assertNumQueries(0):
+                self.assertEqual(book_autocomplete.search('title', 'py'), ['Python 入門'])
+
+
+class BookCoverViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        isbn_cache.clear()
+        cover_root = tempfile.TemporaryDirectory()
+        self.addCleanup(cover_root.cleanup)
+        settings_patcher = self.settings(BOOK_COVER_ROOT=cover_root.name)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
+        image = BytesIO()
+        Image.new('RGB', (400, 600), 'red').save(image, 'JPEG')
+        self.image = image.getvalue()
+
+    @patch('app.services.cover_services.requests.Session.get')
+    def test_120_cover_is_resized_and_cached(self, mock_get):
+        """
+        表紙画像を取得元ごとに1回だけ、収まる最小の画像から取得し、縮小して保存したものを長期間キャッシュさせて返すことを確認
+        """
+        mock_get.return_value = unittest.mock.Mock(status_code=200, content=self.image)
+        Book.objects.create(
+            isbn='1234567890123',
+            title='test',
+            medium_image_url='http://example.com/medium.jpg',
+            large_image_url='http://example.com/large.jpg',
+        )
+
+        response = self.client.get(reverse('app:book_cover', args=['1234567890123', 'thumb', 'webp']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_args.args[0], 'http://example.com/medium.jpg')
+
+        response = self.client.get(reverse('app:book_cover', args=['1234567890123', 'list', 'jpg']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age=', response['Cache-Control'])
+        with Image.open(BytesIO(response.content)) as cover:
+            self.assertEqual(cover.size, (133, 200))
+
+        response = self.client.get(reverse('app:book_cover', args=['1234567890123', 'modal', 'webp']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        with Image.open(BytesIO(response.content)) as cover:
+            self.assertEqual(cover.format, 'WEBP')
+            self.assertEqual(cover.size, (200, 300))
+
+        # 同じ取得元の大きさ(list・modal)は1回の取得でまとめて作成する
+        self.client.get(reverse('app:book_cover', args=['1234567890123', 'list', 'webp']))
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.args[0], 'http://example.com/large.jpg')
+
+        # 画像のホストにはAPIとは別の接続プールを使う
+        self.assertIsNot(cover_client.session, api_client.session)
+
+    @patch('app.services.cover_services.requests.Session.get')
+    def test_121_cover_not_found(self, mock_get):
+        """
+        取得元が分からない本や、不正なISBN・大きさの場合は404を返すことを確認
+        """
+        for args in [
+            ['1234567890123', 'list', 'jpg'],
+            ['..', 'list', 'jpg'],
+            ['1234567890123', 'huge', 'jpg'],
+            ['1234567890123', 'list', 'gif'],
+        ]:
+            response = self.client.get(reverse('app:book_cover', args=args))
+            self.assertEqual(response.status_code, 404)
+        mock_get.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -162,14 +483,15 @@ class PostListViewTests(TestCase):
         self.assertEqual(len(response.context['posts']), 5)
 
         # 2ページ目
-        response = self.client.get(reverse('app:post_list') + '?page=2')
+        response = self.client.get(reverse('app:post_list'), {'cursor': response.context['page_obj'].next_token})
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['posts']), 5)
 
         # 3ページ目（最後のページ）
-        response = self.client.get(reverse('app:post_list') + '?page=3')
+        response = self.client.get(reverse('app:post_list'), {'cursor': response.context['page_obj'].next_token})
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['posts']), 3)
+        self.assertFalse(response.context['page_obj'].has_next())
 
     def test_51_customized_context_object_name(self):
         """
@@ -180,6 +502,66 @@ class PostListViewTests(TestCase):
         self.assertIn('posts', response.context)
         self.assertEqual(len(response.context['posts']), 5)
 
+    def test_125_post_list_query_budget(self):
+        """
+        投稿者ごとのプロフィールを参照しても、投稿一覧のクエリ数が投稿数に依存しないことを確認
+        (件数を数えないため一覧の1回のみ)
+        """
+        for num in range(5):
+            user = User.objects.create_user(email=f'user{num}@test.com', password='test0000')
+            Post.objects.create(
+                user=user,
+                post_title=f'Other Post {num}',
+                reason='reason',
+                impressions='impressions',
+                satisfaction=3,
+                book_title='book_title',
+                author='author',
+                isbn='1234567890123',
+            )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('app:post_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Other Post 4')
+        for post in response.context['posts']:
+            self.assertContains(response, post.user.profile.username)
+
+        # ログイン中は、セッション・ユーザー・プロフィール(context_processors)の3回が加わる
+        self.client.login(email='test@test.com', password='test0000')
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('app:post_mine'))
+        self.assertEqual(len(response.context['posts']), 5)
+
+    def test_127_keyset_pagination_round_trip(self):
+        """
+        次へ・前へのトークンで、投稿の重複や抜けなく行き来できることを確認
+        (更新日時が同じ投稿はidで並べる)
+        """
+        Post.objects.update(updated_at=timezone.now())
+        expected = list(Post.objects.order_by('-updated_at', '-id').values_list('pk', flat=True))
+
+        pages = []
+        response = self.client.get(reverse('app:post_list'))
+        pages.append([post.pk for post in response.context['posts']])
+        while response.context['page_obj'].has_next():
+            response = self.client.get(reverse('app:post_list'), {'cursor': response.context['page_obj'].next_token})
+            pages.append([post.pk for post in response.context['posts']])
+        self.assertEqual(sum(pages, []), expected)
+
+        # 最後のページから前のページへ戻る
+        response = self.client.get(reverse('app:post_list'), {'cursor': response.context['page_obj'].previous_token})
+        self.assertEqual([post.pk for post in response.context['posts']], pages[-2])
+        response = self.client.get(reverse('app:post_list'), {'cursor': response.context['page_obj'].previous_token})
+        self.assertEqual([post.pk for post in response.context['posts']], pages[0])
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+        # 不正なトークンは最初のページとして扱う
+        response = self.client.get(reverse('app:post_list'), {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post.pk for post in response.context['posts']], pages[0])
+        self.assertNotContains(response, '?page=')
+
 class PostDetailViewTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -215,6 +597,9 @@ class PostDetailViewTests(TestCase):
                 created_at=timezone.now(),
             )
 
+    def setUp(self):
+        cache.clear()
+        isbn_cache.clear()
 
     def test_52_check_url_statusCode_and_template_when_access_view(self):
         """
@@ -227,7 +612,7 @@ class PostDetailViewTests(TestCase):
         self.assertTemplateUsed(response, 'app/post_detail.html')
 
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_53_call_get_api_data_method_success(self, mock_get_api_data):
         """
         API接続・データ取得が成功した場合の確認
@@ -247,31 +632,32 @@ class PostDetailViewTests(TestCase):
             }
         }]
 
-        response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        response = self.client.get(reverse('app:post_book', args=[self.post.pk]))
         self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'app/book_info.html')
         self.assertIn('book_data', response.context)
-        self.assertEqual(response.context['book_data']['title'], 'Sample Title')
+        self.assertEqual(response.context['book_data'].title, 'Sample Title')
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_54_call_get_api_data_method_faile(self, mock_get_api_data):
         """
         API接続・データ取得が失敗した場合の確認
         """
         mock_get_api_data.return_value = None
 
-        response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        response = self.client.get(reverse('app:post_book', args=[self.post.pk]))
         self.assertEqual(response.status_code, 200)
         self.assertIn('error_message', response.context)
         self.assertEqual(response.context['error_message'], 'APIのリクエストに失敗しました。')
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_55_call_get_api_data_method_success_however_get_items_is_nothing(self, mock_get_api_data):
         """
         API接続は成功、取得したデータがなかった場合
         """
         mock_get_api_data.return_value = []
 
-        response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        response = self.client.get(reverse('app:post_book', args=[self.post.pk]))
         self.assertEqual(response.status_code, 200)
         self.assertIn('error_message', response.context)
         self.assertEqual(response.context['error_message'], '該当のデータがありません。')
@@ -285,7 +671,124 @@ class PostDetailViewTests(TestCase):
         self.assertIn('post_data', response.context)
         self.assertEqual(response.context['post_data'], self.post)
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
+    def test_94_book_data_from_catalog(self, mock_get_api_data):
+        """
+        カタログに新しい本の情報がある場合、APIを呼び出さずに表示することを確認
+        """
+        Book.objects.create(
+            isbn='1234567890123',
+            title='Catalog Title',
+            author='Catalog Author',
+        )
+
+        response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['book_data'].title, 'Catalog Title')
+        mock_get_api_data.assert_not_called()
+
+    @patch('app.services.book_services.get_api_data')
+    def test_95_stale_book_data_is_refreshed(self, mock_get_api_data):
+        """
+        カタログの情報が古い場合、APIから取得してカタログを更新することを確認
+        """
+        Book.objects.create(
+            isbn='1234567890123',
+            title='Old Title',
+            fetched_at=timezone.now() - timedelta(days=365),
+        )
+        mock_get_api_data.return_value = [{
+            'Item': {
+                'title': 'New Title',
+                'isbn': '1234567890123',
+            }
+        }]
+
+        response = self.client.get(reverse('app:post_book', args=[self.post.pk]))
+        self.assertEqual(response.context['book_data'].title, 'New Title')
+        self.assertEqual(Book.objects.get(isbn='1234567890123').title, 'New Title')
+        mock_get_api_data.assert_called_once()
+
+        # APIに失敗した場合は古い情報を表示する
+        Book.objects.filter(isbn='1234567890123').update(
+            fetched_at=timezone.now() - timedelta(days=365)
+        )
+        mock_get_api_data.return_value = None
+
+        response = self.client.get(reverse('app:post_book', args=[self.post.pk]))
+        self.assertEqual(response.context['book_data'].title, 'New Title')
+
+    @patch('app.services.book_services.get_api_data')
+    def test_112_detail_page_does_not_wait_for_slow_api(self, mock_get_api_data):
+        """
+        カタログにない本の情報の取得が間に合わない場合は待たずに表示し、モーダルを開いた時に取得することを確認
+        """
+        mock_get_api_data.side_effect = lambda *args, **kwargs: time.sleep(1) or []
+
+        with self.settings(POST_DETAIL_BOOK_WAIT=0.05):
+            started = time.monotonic()
+            response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['book_data'])
+        self.assertContains(response, reverse('app:post_book', args=[self.post.pk]))
+
+    @patch('app.services.book_services.get_api_data')
+    def test_117_detail_page_looks_up_book_with_comments(self, mock_get_api_data):
+        """
+        カタログにない本の情報をコメントの取得と並行して取得し、間に合った場合はページに埋め込んでカタログに登録することを確認
+        """
+        mock_get_api_data.return_value = [{
+            'Item': {'title': 'Sample Title', 'isbn': self.post.isbn}
+        }]
+
+        with self.settings(POST_DETAIL_BOOK_WAIT=5):
+            response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['book_data'].title, 'Sample Title')
+        self.assertTrue(Book.objects.filter(isbn=self.post.isbn).exists())
+        mock_get_api_data.assert_called_once()
+
+    @patch('app.services.book_services.get_api_data')
+    def test_134_detail_page_keeps_stale_book(self, mock_get_api_data):
+        """
+        カタログの情報が古く、APIから取得できない場合は古い情報を表示することを確認
+        """
+        mock_get_api_data.return_value = None
+        Book.objects.create(
+            isbn=self.post.isbn,
+            title='Stale Title',
+            fetched_at=timezone.now() - timedelta(days=365),
+        )
+
+        response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['book_data'].title, 'Stale Title')
+        mock_get_api_data.assert_called_once()
+
+    @patch('app.services.post_services.lookup_isbn')
+    def test_139_detail_page_survives_lookup_errors(self, mock_lookup_isbn):
+        """
+        本の情報の取得で予期しないエラーが起きた場合も、古い情報(またはモーダル)でページを表示することを確認
+        """
+        mock_lookup_isbn.side_effect = KeyError('Item')
+
+        with self.assertLogs('app.services.post_services', 'ERROR'):
+            response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['book_data'])
+        self.assertContains(response, reverse('app:post_book', args=[self.post.pk]))
+
+        Book.objects.create(
+            isbn=self.post.isbn,
+            title='Stale Title',
+            fetched_at=timezone.now() - timedelta(days=365),
+        )
+        with self.assertLogs('app.services.post_services', 'ERROR'):
+            response = self.client.get(reverse('app:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.context['book_data'].title, 'Stale Title')
+
+    @patch('app.services.book_services.get_api_data')
     def test_87_get_comment_object(self, mock_get_api_data):
         """
         Postオブジェクトに紐付いたcommentが抽出されているかを確認
@@ -311,7 +814,7 @@ class PostDetailViewTests(TestCase):
         comment = response.context['comment_data'][0]
         self.assertEqual(comment.post.pk, self.post.pk)
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_88_get_comment_object_pagination(self, mock_get_api_data):
         """
         ページネーションにより、各ページに表示される件数を確認
@@ -348,7 +851,7 @@ class PostDetailViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['comment_data']), 3)
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_89_get_comment_object_pagination_invalid_page(self, mock_get_api_data):
         """
         範囲外のページが指定された場合、最後のページに移動するか確認
@@ -373,6 +876,25 @@ class PostDetailViewTests(TestCase):
         self.assertEqual(len(response.context['comment_data']), 3)
         self.assertEqual(response.context['comment_data'].number, 3)
 
+    @patch('app.services.book_services.get_api_data')
+    def test_128_comment_pager_uses_comment_count(self, mock_get_api_data):
+        """
+        コメントのページ送りは投稿のコメント数を使い、COUNT(*)を発行しないことを確認
+        """
+        mock_get_api_data.return_value = None
+        url = reverse('app:post_detail', args=[self.post.pk])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': 2})
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+        self.assertEqual(response.context['comment_data'].paginator.count, 13)
+        self.assertEqual(len(response.context['comment_data']), 5)
+
+        Comment.objects.create(user=self.comment_user, comment='New comment', post=self.post)
+        response = self.client.get(url, {'page': 3})
+        self.assertEqual(response.context['comment_data'].paginator.count, 14)
+        self.assertEqual(len(response.context['comment_data']), 4)
+
 class PostCreateViewTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -388,8 +910,10 @@ class PostCreateViewTests(TestCase):
             password='test0000'
             )
         self.isbn = '1234567890123'
+        cache.clear()
+        isbn_cache.clear()
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_57_get_request_api_success(self, mock_get_api_data):
         """
         getメッソドにて、API接続が成功、かつ、データを取得した場合のtemplate, status_code, context を確認
@@ -408,9 +932,9 @@ class PostCreateViewTests(TestCase):
         self.assertTemplateUsed(response, 'app/post_form.html')
         self.assertIn('form', response.context)
         self.assertIn('book_data', response.context)
-        self.assertEqual(response.context['book_data']['title'], 'Sample Title')
+        self.assertEqual(response.context['book_data'].title, 'Sample Title')
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_58_get_request_api_failure(self, mock_get_api_data):
         """
         getメッソドにて、API接続に失敗した場合のtemplate, status_code, context を確認
@@ -423,7 +947,7 @@ class PostCreateViewTests(TestCase):
         self.assertIn('error_message', response.context)
         self.assertEqual(response.context['error_message'], 'APIのリクエストに失敗しました。')
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_59_get_request_api_success_however_not_found_items(self, mock_get_api_data):
         """
         getメッソドにて、API接続に成功したが、該当のデータがなかった場合のtemplate, status_code, context を確認
@@ -436,7 +960,7 @@ class PostCreateViewTests(TestCase):
         self.assertIn('error_message', response.context)
         self.assertEqual(response.context['error_message'], '該当のデータがありません。')
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_60_post_request_success(self, mock_get_api_data):
         """
         postメソッドにて、有効なデータでリクエストされた場合
@@ -469,7 +993,7 @@ class PostCreateViewTests(TestCase):
         self.assertEqual(len(messages), 1)
         self.assertEqual(str(messages[0]), '新規投稿をしました。')
 
-    @patch('app.views.post_views.get_api_data')
+    @patch('app.services.book_services.get_api_data')
     def test_61_post_request_invalid_form(self, mock_get_api_data):
         """
         postメソッドにて、無効なデータにおいてリクエストされた場合
@@ -712,23 +1236,23 @@ class MyPostListViewTests(TestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
         posts = response.context['posts']
-        self.assertEqual(posts.count(), 5)
+        self.assertEqual(len(posts), 5)
         for post in posts:
             self.assertEqual(post.user, self.main_user)
 
         # 2ページ目
-        response = self.client.get(self.url + '?page=2')
+        response = self.client.get(self.url, {'cursor': response.context['page_obj'].next_token})
         self.assertEqual(response.status_code, 200)
         posts = response.context['posts']
-        self.assertEqual(posts.count(), 5)
+        self.assertEqual(len(posts), 5)
         for post in posts:
             self.assertEqual(post.user, self.main_user)
 
         # 3ページ目（最後のページ）
-        response = self.client.get(self.url + '?page=3')
+        response = self.client.get(self.url, {'cursor': response.context['page_obj'].next_token})
         self.assertEqual(response.status_code, 200)
         posts = response.context['posts']
-        self.assertEqual(posts.count(), 3)
+        self.assertEqual(len(posts), 3)
         for post in posts:
             self.assertEqual(post.user, self.main_user)
 
@@ -880,6 +1404,73 @@ class CommentDeleteViewTests(TestCase):
         self.assertEqual(len(messages), 1)
         self.assertEqual(str(messages[0]), 'コメントを削除しました。')
 
+    def test_130_comment_count_follows_create_and_delete(self):
+        """
+        コメントの投稿・削除で、投稿のコメント数と最終コメント日時が更新されることを確認
+        """
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_commented_at, self.comment.created_at)
+
+        self.client.login(
+            email="others_user@test.com",
+            password="test0000"
+            )
+        self.client.post(reverse('app:comment_new', args=[self.post.pk]), data={'comment': 'New comment'})
+        new_comment = Comment.objects.get(comment='New comment')
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.last_commented_at, new_comment.created_at)
+
+        self.client.post(reverse('app:comment_delete', args=[self.post.pk, new_comment.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_commented_at, self.comment.created_at)
+
+    def test_141_cascaded_comments_do_not_update_deleted_posts(self):
+        """
+        投稿・ユーザーの削除で一緒に削除されるコメントは削除される投稿を更新せず、
+        残る投稿のコメント数のみ更新されることを確認
+        """
+        for i in range(3):
+            Comment.objects.create(user=self.others_user, comment=f'comment {i}', post=self.post)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.post.delete()
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+        other_post = Post.objects.create(
+            user=self.post_user,
+            post_title="other_post",
+            reason="reason",
+            impressions="impressions",
+            satisfaction=5,
+            book_title="book_title",
+            author="author",
+            isbn="0000000000001",
+        )
+        own_post = Post.objects.create(
+            user=self.others_user,
+            post_title="own_post",
+            reason="reason",
+            impressions="impressions",
+            satisfaction=5,
+            book_title="book_title",
+            author="author",
+            isbn="0000000000002",
+        )
+        Comment.objects.create(user=self.others_user, comment='on other post', post=other_post)
+        Comment.objects.create(user=self.comment_user, comment='on other post', post=other_post)
+        for i in range(3):
+            Comment.objects.create(user=self.comment_user, comment=f'on own post {i}', post=own_post)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.others_user.delete()
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE')]), 1)
+        other_post.refresh_from_db()
+        self.assertEqual(other_post.comment_count, 1)
+
     def test_85_request_logged_in_others_user(self):
         """
         ログインした他のユーザーにおいて、削除がリクエストされた場合を確認
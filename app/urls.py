@@ -2,6 +2,7 @@ from django.urls import path
 from app.views.post_views import (
     PostListView,
     PostDetailView,
+    PostBookView,
     PostUpdateView,
     PostCreateView,
     PostDeleteView,
@@ -13,6 +14,9 @@ from app.views.comment_views import (
 )
 from app.views.book_views import (
     BookSearchView,
+    BookSearchPageView,
+    BookCoverView,
+    BookAutocompleteView,
 )
 
 app_name = 'app'
@@ -20,6 +24,7 @@ app_name = 'app'
 urlpatterns = [
     path('', PostListView.as_view(), name='post_list'),
     path('posts/<int:pk>/', PostDetailView.as_view(), name='post_detail'),
+    path('posts/<int:pk>/book/', PostBookView.as_view(), name='post_book'),
     path('posts/<int:pk>/edit/', PostUpdateView.as_view(), name='post_edit'),
     path('posts/<int:pk>/delete/', PostDeleteView.as_view(), name='post_delete'),
     path('posts/new/<str:isbn>/', PostCreateView.as_view(), name='post_new'),
@@ -29,5 +34,8 @@ urlpatterns = [
     path('posts/<int:pk>/comment/<int:comment_id>/delete/', CommentDeleteView.as_view(), name='comment_delete'),
 
     path('book/search/', BookSearchView.as_view(), name='book_search'),
+    path('book/search/results/', BookSearchPageView.as_view(), name='book_search_page'),
+    path('book/autocomplete/', BookAutocompleteView.as_view(), name='book_autocomplete'),
+    path('book/<str:isbn>/cover/<slug:variant>.<slug:fmt>', BookCoverView.as_view(), name='book_cover'),
 
     ]
@@ -1,61 +1,170 @@
+import logging
+from asgiref.sync import sync_to_async
+from urllib.parse import urlencode
 from django.shortcuts import render
+from django.conf import settings
+from django.urls import reverse
 from django.views.generic import View
-from .api_views import get_api_data
+from app.services.book_services import SEARCH_MAX_PAGE, asearch_books, has_next_page, search_local_books
+from app.services.autocomplete_services import book_autocomplete
+from app.services.deadline_services import Deadline
+from app.services.cover_services import (
+    COVER_VARIANTS,
+    COVER_FORMATS,
+    is_valid_isbn,
+    cover_path,
+    cover_sources,
+    get_cover,
+    read_cover,
+)
+from app.services.rakuten_services import run_in_api_executor
 from app.forms.book_forms import BookSearchForm
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, Http404
+
+logger = logging.getLogger(__name__)
+
+
+def next_page_url(title, author, records, page):
+    if not has_next_page(records, settings.SEARCH_PAGE_SIZE, page):
+        return None
+
+    query = {'title': title, 'page': page + 1}
+    if author:
+        query['author'] = author
+    return f"{reverse('app:book_search_page')}?{urlencode(query)}"
 
 
 class BookSearchView(View):
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         form = BookSearchForm(request.POST or None)
 
-        return render(request, 'app/book_form.html', context={
+        return await sync_to_async(render)(request, 'app/book_form.html', context={
             'form': form,
         })
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
+        deadline = Deadline(settings.RAKUTEN_API_DEADLINE)
         form = BookSearchForm(request.POST or None)
 
         if form.is_valid():
             input_title = form.cleaned_data.get('title', '')
             input_author = form.cleaned_data.get('author', '')
-            params = {
-                'title': input_title,
-                'hits': 30,
-            }
-            if input_author:
-                params['author'] = input_author
 
             try:
-                items = get_api_data(params=params)
-            except Exception as e:
-                return JsonResponse({'error': str(e)}, status=500)
+                book_data = await asearch_books(
+                    input_title,
+                    input_author,
+                    hits=settings.SEARCH_PAGE_SIZE,
+                    deadline=deadline,
+                    prefetch=True,
+                )
+            except Exception:
+                logger.exception('書籍の検索に失敗しました。')
+                book_data = None
 
-            if items is None:
-                return render(request, 'app/book_list.html', context={
-                    'search_words': f'{input_title} {input_author}' if input_author else input_title
+            if book_data is None:
+                # APIを利用できない場合は、カタログと投稿済みの本から検索する
+                return await sync_to_async(render)(request, 'app/book_list.html', context={
+                    'book_data': await sync_to_async(search_local_books)(
+                        input_title,
+                        input_author,
+                        limit=settings.SEARCH_PAGE_SIZE * 3,
+                    ),
+                    'search_words': f'{input_title} {input_author}' if input_author else input_title,
+                    'degraded': True,
                 })
 
-            book_data = []
-            for i in items:
-                item = i['Item']
-                title = item['title']
-                author = item['author']
-                isbn = item['isbn']
-                largeImageUrl = item['largeImageUrl']
-                query = {
-                'title': title,
-                'author': author,
-                'isbn': isbn,
-                'image': largeImageUrl,
-                }
-                book_data.append(query)
-
-            return render(request, 'app/book_list.html', context={
+            return await sync_to_async(render)(request, 'app/book_list.html', context={
                 'book_data': book_data,
                 'search_words': f'{input_title} {input_author}' if input_author else input_title,
+                'next_url': next_page_url(input_title, input_author, book_data, 1),
             })
 
-        return render(request, 'app/book_form.html', context={
+        return await sync_to_async(render)(request, 'app/book_form.html', context={
             'form': form,
         })
+
+
+class BookSearchPageView(View):
+    """
+    検索結果の2ページ目以降(無限スクロール用のHTMLの断片)
+    """
+
+    async def get(self, request, *args, **kwargs):
+        deadline = Deadline(settings.RAKUTEN_API_DEADLINE)
+        form = BookSearchForm(request.GET)
+
+        try:
+            page = int(request.GET.get('page', 2))
+        except ValueError:
+            page = 0
+        if not form.is_valid() or not 1 <= page <= SEARCH_MAX_PAGE:
+            return HttpResponseBadRequest()
+
+        input_title = form.cleaned_data.get('title', '')
+        input_author = form.cleaned_data.get('author', '')
+
+        try:
+            book_data = await asearch_books(
+                input_title,
+                input_author,
+                hits=settings.SEARCH_PAGE_SIZE,
+                page=page,
+                deadline=deadline,
+                prefetch=True,
+            )
+        except Exception:
+            logger.exception('書籍の検索に失敗しました。')
+            book_data = None
+
+        return await sync_to_async(render)(request, 'app/book_list_page.html', context={
+            'book_data': book_data or [],
+            'lazy_images': True,
+            'next_url': next_page_url(input_title, input_author, book_data, page),
+            'degraded': book_data is None,
+        })
+
+
+class BookAutocompleteView(View):
+    """
+    入力途中のタイトル・著者名の候補(カタログと投稿済みの本から、APIは使わない)
+    """
+
+    def get(self, request, *args, **kwargs):
+        field = request.GET.get('field', 'title')
+        if field not in book_autocomplete.indexes:
+            return HttpResponseBadRequest()
+
+        results = book_autocomplete.search(
+            field,
+            request.GET.get('q', ''),
+            limit=settings.AUTOCOMPLETE_LIMIT,
+        )
+        return JsonResponse({'results': results})
+
+
+class BookCoverView(View):
+    """
+    表紙画像。大きさごとに初回のみ取得元から取得して縮小・保存し、以降は保存した画像を長期間キャッシュさせて返す
+    """
+
+    async def get(self, request, isbn, variant, fmt, *args, **kwargs):
+        if not is_valid_isbn(isbn) or variant not in COVER_VARIANTS or fmt not in COVER_FORMATS:
+            raise Http404
+
+        # ファイルの読み込みもスレッドで行い、イベントループを止めない
+        content = await sync_to_async(read_cover)(cover_path(isbn, variant, fmt))
+        if content is None:
+            sources = await sync_to_async(cover_sources)(isbn)
+            if variant not in sources:
+                raise Http404
+            path = await run_in_api_executor(get_cover, isbn, variant, fmt, sources)
+            if path is None:
+                raise Http404
+            content = await sync_to_async(read_cover)(path)
+            if content is None:
+                raise Http404
+
+        response = HttpResponse(content, content_type=COVER_FORMATS[fmt][1])
+        response['Cache-Control'] = f'public, max-age={settings.BOOK_COVER_MAX_AGE}, immutable'
+        return response
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView, DeleteView
@@ -24,7 +25,9 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         if comment_form.is_valid():
             comment_form.instance.user = request.user
             comment_form.instance.post_id = post.pk
-            comment_form.save()
+            # 投稿のコメント数の更新(シグナル)と同じトランザクションで保存する
+            with transaction.atomic():
+                comment_form.save()
             messages.success(self.request, 'コメントを投稿しました。')
             return redirect('app:post_detail', pk=post.pk)
         else:
@@ -41,6 +44,11 @@ class CommentDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
         post_id = self.kwargs['pk']
         return reverse_lazy('app:post_detail', kwargs={'pk': post_id})
 
+    def form_valid(self, form):
+        # 投稿のコメント数の更新(シグナル)と同じトランザクションで削除する
+        with transaction.atomic():
+            return super().form_valid(form)
+
     def dispatch(self, request, *args, **kwargs):
         post_id = kwargs['pk']
         comment = self.get_object()
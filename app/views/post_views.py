@@ -1,8 +1,10 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
+from django.http import Http404
 from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.conf import settings
 
 from django.views.generic import View
 from django.views.generic.list import ListView
@@ -10,21 +12,24 @@ from django.views.generic.detail import DetailView
 from django.views.generic.edit import UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 
-from .api_views import get_api_data
+from app.models.book_models import Book
 from app.models.post_models import Post
+from app.services.book_services import aget_book, aget_book_summary
+from app.services.deadline_services import Deadline
+from app.services.post_services import aassemble_post_detail
 from app.forms.post_forms import PostForm
-from app.models.comment_models import Comment
 from app.forms.comment_forms import CommentForm
+from app.paginators import KeysetPaginationMixin
 
 
-class PostListView(ListView):
+class PostListView(KeysetPaginationMixin, ListView):
     model = Post
     paginate_by = 5
     template_name = 'index.html'
     context_object_name = 'posts'
 
     def get_queryset(self):
-        return Post.objects.all().order_by('-updated_at')
+        return Post.objects.for_list()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,72 +47,21 @@ class PostListView(ListView):
 class PostDetailView(DetailView):
     model = Post
 
-    def get(self, request, *args, **kwargs):
-        post_data = Post.objects.get(pk=kwargs['pk'])
-
-        isbn = self.get_queryset().first().isbn
-        params = {
-            'isbn': isbn,
-        }
-
-        api_response = get_api_data(params)
-        if api_response is None:
-            return render(request, 'app/post_detail.html', {
-                'post_data': post_data,
-                'error_message': 'APIのリクエストに失敗しました。'
-            })
-
-        if not api_response:
-            return render(request, 'app/post_detail.html', {
-                'post_data': post_data,
-                'error_message': '該当のデータがありません。'
-            })
-
-        items = api_response
-        item = items[0]['Item']
-        title = item['title']
-        image = item['largeImageUrl']
-        author = item['author']
-        salesDate = item['salesDate']
-        publisherName = item['publisherName']
-        isbn = item['isbn']
-        itemCaption = item['itemCaption']
-        itemUrl = item['itemUrl']
-        reviewAverage = item['reviewAverage']
-        reviewCount = item['reviewCount']
-
-        book_data = {
-            'title': title,
-            'image': image,
-            'author': author,
-            'salesDate': salesDate,
-            'publisherName': publisherName,
-            'isbn': isbn,
-            'itemCaption': itemCaption,
-            'itemUrl': itemUrl,
-            'reviewAverage': reviewAverage,
-            'reviewCount': reviewCount,
-        }
-
-        comment_list = Comment.objects.filter(post_id=kwargs['pk']).order_by('-created_at')
-        page = request.GET.get('page', 1)
-        paginator = Paginator(comment_list, 5)
-
+    async def get(self, request, *args, **kwargs):
         try:
-            comment_data = paginator.page(page)
-        except PageNotAnInteger:
-            comment_data = paginator.page(1)
-        except EmptyPage:
-            comment_data = paginator.page(paginator.num_pages)
+            post_data = await Post.objects.select_related('book').aget(pk=kwargs['pk'])
+        except Post.DoesNotExist:
+            raise Http404
 
+        detail = await aassemble_post_detail(post_data, request.GET.get('page', 1))
         comment_form = CommentForm()
 
-        return render(request, 'app/post_detail.html', context={
+        return await sync_to_async(render)(request, 'app/post_detail.html', context={
             'post_data': post_data,
             'satisfaction_range': range(5),
             'satisfaction_int': int(post_data.satisfaction),
-            'book_data': book_data,
-            'comment_data': comment_data,
+            'book_data': detail['book_data'],
+            'comment_data': detail['comment_data'],
             'comment_form': comment_form
         })
 
@@ -117,6 +71,44 @@ class PostDetailView(DetailView):
         return post_data
 
 
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    非同期ビュー用のLoginRequiredMixin
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+class PostBookView(View):
+
+    async def get(self, request, *args, **kwargs):
+        deadline = Deadline(settings.RAKUTEN_API_DEADLINE)
+        try:
+            post_data = await Post.objects.select_related('book').aget(pk=kwargs['pk'])
+        except Post.DoesNotExist:
+            raise Http404
+
+        try:
+            book = await aget_book(post_data.isbn, book=post_data.book, deadline=deadline)
+        except Book.DoesNotExist:
+            return await sync_to_async(render)(request, 'app/book_info.html', {
+                'error_message': '該当のデータがありません。'
+            })
+
+        if book is None:
+            return await sync_to_async(render)(request, 'app/book_info.html', {
+                'error_message': 'APIのリクエストに失敗しました。'
+            })
+
+        return await sync_to_async(render)(request, 'app/book_info.html', {
+            'book_data': book,
+        })
+
+
 class PostUpdateView(LoginRequiredMixin, UpdateView):
     model = Post
     template_name = 'app/post_form.html'
@@ -149,55 +141,40 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
         return super().dispatch(request, *args, **kwargs)
 
 
-class PostCreateView(LoginRequiredMixin, View):
+class PostCreateView(AsyncLoginRequiredMixin, View):
 
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
+        deadline = Deadline(settings.RAKUTEN_API_DEADLINE)
         isbn = self.kwargs['isbn']
-        params = {
-            'isbn': isbn,
-        }
 
-        api_response = get_api_data(params)
-        if api_response is None:
-            return render(request, 'app/book_form.html', {
-                'error_message': 'APIのリクエストに失敗しました。'
-            })
-
-        if not api_response:
-            return render(request, 'app/book_form.html', {
+        try:
+            book = await aget_book_summary(isbn, deadline=deadline)
+        except Book.DoesNotExist:
+            return await sync_to_async(render)(request, 'app/book_form.html', {
                 'error_message': '該当のデータがありません。'
             })
 
-        items = api_response[0]
-        item = items['Item']
-        title = item['title']
-        author = item['author']
-        isbn = item['isbn']
-        image = item['largeImageUrl']
-
-        book_data = {
-            'title': title,
-            'author': author,
-            'isbn': isbn,
-            'image': image,
-        }
+        if book is None:
+            return await sync_to_async(render)(request, 'app/book_form.html', {
+                'error_message': 'APIのリクエストに失敗しました。'
+            })
 
         form = PostForm(
             request.POST or None,
             initial={
-                'book_title_display': book_data['title'],
-                'author_display': book_data['author'],
-                'isbn_display': book_data['isbn'],
+                'book_title_display': book.title,
+                'author_display': book.author,
+                'isbn_display': book.isbn,
             }
         )
 
-        return render(request, 'app/post_form.html', context={
+        return await sync_to_async(render)(request, 'app/post_form.html', context={
             'form': form,
-            'book_data': book_data,
+            'book_data': book,
 
         })
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         form = PostForm(request.POST or None)
         book_data = {
             'book_title': form.data['book_title'],
@@ -205,7 +182,7 @@ class PostCreateView(LoginRequiredMixin, View):
             'isbn': form.data['isbn'],
         }
 
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             post_data = Post()
             post_data.user = request.user
             post_data.post_title = form.cleaned_data['post_title']
@@ -215,11 +192,11 @@ class PostCreateView(LoginRequiredMixin, View):
             post_data.book_title = book_data['book_title']
             post_data.author = book_data['author']
             post_data.isbn = book_data['isbn']
-            post_data.save()
+            await post_data.asave()
             messages.success(request, '新規投稿をしました。')
             return redirect('app:post_list')
 
-        return render(request, 'app/post_form.html', context={
+        return await sync_to_async(render)(request, 'app/post_form.html', context={
             'form': form,
             'book_data': book_data,
         })
@@ -238,14 +215,14 @@ class PostDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
         return super().dispatch(request, *args, **kwargs)
 
 
-class MyPostListView(LoginRequiredMixin, ListView):
+class MyPostListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Post
     paginate_by = 5
     template_name = 'index.html'
     context_object_name = 'posts'
 
     def get_queryset(self):
-        return Post.objects.filter(user=self.request.user).order_by('-updated_at')
+        return Post.objects.filter(user=self.request.user).for_list()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
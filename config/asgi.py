@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+楽天ブックスAPIを呼び出す画面(本の検索、新規投稿、本の情報)は非同期ビューのため、
+ASGIで起動すると1プロセスで多数のAPI呼び出しを待機できる
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
@@ -14,6 +14,7 @@ from dotenv import load_dotenv
 from pathlib import Path
 import os
 import sys
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -70,6 +71,97 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS')
 
 # API
 API_KEY = os.getenv('API_KEY')
+RAKUTEN_API_URL = os.getenv(
+    'RAKUTEN_API_URL',
+    'https://app.rakuten.co.jp/services/api/BooksBook/Search/20170404?'
+)
+RAKUTEN_API_POOL_MAXSIZE = int(os.getenv('RAKUTEN_API_POOL_MAXSIZE', '10'))
+RAKUTEN_API_CONNECT_TIMEOUT = float(os.getenv('RAKUTEN_API_CONNECT_TIMEOUT', '3.05'))
+RAKUTEN_API_READ_TIMEOUT = float(os.getenv('RAKUTEN_API_READ_TIMEOUT', '5'))
+RAKUTEN_API_SINGLEFLIGHT_SHARED = os.getenv('RAKUTEN_API_SINGLEFLIGHT_SHARED') == 'True'
+# 非同期ビューからAPIを呼び出すスレッド数(既定は接続プールの大きさ)
+# API呼び出しはrequestsをこのスレッドで実行するため、プロセスごとに同時に待てる呼び出し(レート制限の待ちを含む)はこの数までになる
+# 同時に多くの検索を受ける場合は、楽天ブックスAPIのレート制限の範囲でこの値を大きくする
+RAKUTEN_API_ASYNC_WORKERS = int(os.getenv('RAKUTEN_API_ASYNC_WORKERS', str(RAKUTEN_API_POOL_MAXSIZE)))
+
+# 1リクエストの中で上流の呼び出しに使える時間(応答時間の目標のうちの持ち分)
+RAKUTEN_API_DEADLINE = float(os.getenv('RAKUTEN_API_DEADLINE', '2'))
+# 残り時間がこれより短い場合はAPIを呼び出さない(秒)
+RAKUTEN_API_MIN_TIMEOUT = float(os.getenv('RAKUTEN_API_MIN_TIMEOUT', '0.1'))
+RAKUTEN_API_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('RAKUTEN_API_CIRCUIT_FAILURE_THRESHOLD', '5'))
+RAKUTEN_API_CIRCUIT_RESET_TIMEOUT = float(os.getenv('RAKUTEN_API_CIRCUIT_RESET_TIMEOUT', '30'))
+# 残り時間で短くしたタイムアウトでも、これ以上待った場合は遮断の失敗として数える(秒)
+RAKUTEN_API_CIRCUIT_MIN_TIMEOUT = float(os.getenv('RAKUTEN_API_CIRCUIT_MIN_TIMEOUT', '1'))
+# 応答の遅いISBN検索に重複リクエストを送る(hedging)
+RAKUTEN_API_HEDGE = os.getenv('RAKUTEN_API_HEDGE') == 'True'
+RAKUTEN_API_HEDGE_PERCENTILE = float(os.getenv('RAKUTEN_API_HEDGE_PERCENTILE', '95'))
+RAKUTEN_API_HEDGE_MAX_RATIO = float(os.getenv('RAKUTEN_API_HEDGE_MAX_RATIO', '0.05'))
+RAKUTEN_API_HEDGE_MIN_SAMPLES = int(os.getenv('RAKUTEN_API_HEDGE_MIN_SAMPLES', '20'))
+
+# API rate limit (applicationIdごと)
+RAKUTEN_API_RATE = float(os.getenv('RAKUTEN_API_RATE', '1'))
+RAKUTEN_API_BURST = int(os.getenv('RAKUTEN_API_BURST', '3'))
+RAKUTEN_API_RESERVE = int(os.getenv('RAKUTEN_API_RESERVE', '1'))
+RAKUTEN_API_MAX_WAIT_HIGH = float(os.getenv('RAKUTEN_API_MAX_WAIT_HIGH', '3'))
+RAKUTEN_API_MAX_WAIT_LOW = float(os.getenv('RAKUTEN_API_MAX_WAIT_LOW', '1'))
+RAKUTEN_API_RATE_LIMIT_BACKEND = os.getenv('RAKUTEN_API_RATE_LIMIT_BACKEND', 'file')
+RAKUTEN_API_RATE_LIMIT_FILE = os.getenv(
+    'RAKUTEN_API_RATE_LIMIT_FILE',
+    os.path.join(tempfile.gettempdir(), 'book_reviews_base_rakuten_ratelimit')
+)
+
+# Book catalog
+BOOK_CATALOG_TTL = int(os.getenv('BOOK_CATALOG_TTL', str(60 * 60 * 24 * 7)))
+# 投稿詳細ページで、カタログにない本の情報の取得を待つ秒数(コメントの取得後)
+POST_DETAIL_BOOK_WAIT = float(os.getenv('POST_DETAIL_BOOK_WAIT', '0.2'))
+
+# ISBN lookup cache
+ISBN_CACHE_MAXSIZE = int(os.getenv('ISBN_CACHE_MAXSIZE', '1024'))
+ISBN_CACHE_TTL = int(os.getenv('ISBN_CACHE_TTL', str(60 * 60 * 24)))
+ISBN_CACHE_STALE_TTL = int(os.getenv('ISBN_CACHE_STALE_TTL', str(60 * 60 * 24 * 7)))
+ISBN_CACHE_NEGATIVE_TTL = int(os.getenv('ISBN_CACHE_NEGATIVE_TTL', '300'))
+
+# Book search cache
+SEARCH_CACHE_MAXSIZE = int(os.getenv('SEARCH_CACHE_MAXSIZE', '256'))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', str(60 * 60)))
+SEARCH_CACHE_STALE_TTL = int(os.getenv('SEARCH_CACHE_STALE_TTL', str(60 * 60 * 24)))
+SEARCH_CACHE_NEGATIVE_TTL = int(os.getenv('SEARCH_CACHE_NEGATIVE_TTL', '60'))
+# 検索結果の1ページあたりの件数(2ページ目以降はスクロールに合わせて読み込む)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '12'))
+# 入力途中のタイトル・著者名の候補の件数
+AUTOCOMPLETE_LIMIT = int(os.getenv('AUTOCOMPLETE_LIMIT', '10'))
+# 候補の索引を作り直す間隔(秒)。共有キャッシュを使わない構成でも、他のワーカーでの追加・変更・削除はこの間隔で反映される
+AUTOCOMPLETE_TTL = int(os.getenv('AUTOCOMPLETE_TTL', '300'))
+
+# Pagination
+# プロフィールの投稿のページ送りで、総件数のキャッシュを使う秒数
+PAGINATOR_COUNT_TTL = int(os.getenv('PAGINATOR_COUNT_TTL', '300'))
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Logging
+# アプリのログ(APIの重複リクエストの集計・検索の失敗など)を標準エラーに出力する
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'app': {
+            'handlers': ['console'],
+            'level': os.getenv('APP_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
 
 # Application definition
 
@@ -127,6 +219,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Password validation
@@ -171,6 +264,11 @@ STATICFILES_DIRS = [
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Book cover images (取得元から縮小して保存した表紙画像)
+BOOK_COVER_ROOT = os.getenv('BOOK_COVER_ROOT', os.path.join(MEDIA_ROOT, 'covers'))
+BOOK_COVER_QUALITY = int(os.getenv('BOOK_COVER_QUALITY', '85'))
+BOOK_COVER_MAX_AGE = int(os.getenv('BOOK_COVER_MAX_AGE', str(60 * 60 * 24 * 365)))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
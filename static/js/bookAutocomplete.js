@@ -0,0 +1,59 @@
+"use strict";
+
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('bookSearchForm');
+
+    if (!form || !form.dataset.autocompleteUrl) {
+        return;
+    }
+
+    ['title', 'author'].forEach(function(field) {
+        const input = form.querySelector('[name="' + field + '"]');
+        if (!input) {
+            return;
+        }
+
+        const datalist = document.createElement('datalist');
+        datalist.id = 'bookAutocomplete-' + field;
+        form.appendChild(datalist);
+        input.setAttribute('list', datalist.id);
+        input.setAttribute('autocomplete', 'off');
+
+        let timer = null;
+        let controller = null;
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                const query = input.value.trim();
+                if (!query) {
+                    datalist.innerHTML = '';
+                    return;
+                }
+
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+
+                const params = new URLSearchParams({ field: field, q: query });
+                fetch(form.dataset.autocompleteUrl + '?' + params.toString(), { signal: controller.signal })
+                    .then(function(response) {
+                        if (!response.ok) {
+                            throw new Error(response.statusText);
+                        }
+                        return response.json();
+                    })
+                    .then(function(data) {
+                        datalist.innerHTML = '';
+                        data.results.forEach(function(result) {
+                            const option = document.createElement('option');
+                            option.value = result;
+                            datalist.appendChild(option);
+                        });
+                    })
+                    .catch(function() {});
+            }, 150);
+        });
+    });
+});
@@ -0,0 +1,34 @@
+"use strict";
+
+document.addEventListener('DOMContentLoaded', function() {
+    const modal = document.getElementById('openModal');
+    const bookInfo = document.getElementById('bookInfo');
+
+    if (!modal || !bookInfo || !bookInfo.dataset.url) {
+        return;
+    }
+
+    let loaded = false;
+
+    modal.addEventListener('show.bs.modal', function() {
+        if (loaded) {
+            return;
+        }
+        loaded = true;
+
+        fetch(bookInfo.dataset.url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            })
+            .then(function(html) {
+                bookInfo.innerHTML = html;
+            })
+            .catch(function() {
+                loaded = false;
+                bookInfo.innerHTML = '<p class="text-center text-danger">本の情報の取得に失敗しました。</p>';
+            });
+    });
+});
@@ -0,0 +1,54 @@
+"use strict";
+
+document.addEventListener('DOMContentLoaded', function() {
+    const results = document.getElementById('bookSearchResults');
+
+    if (!results || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    let loading = false;
+
+    const observer = new IntersectionObserver(function(entries) {
+        entries.forEach(function(entry) {
+            if (entry.isIntersecting) {
+                loadNext(entry.target);
+            }
+        });
+    }, { rootMargin: '400px' });
+
+    function observeNext() {
+        const next = document.getElementById('bookSearchNext');
+        if (next) {
+            observer.observe(next);
+        }
+    }
+
+    function loadNext(next) {
+        if (loading) {
+            return;
+        }
+        loading = true;
+        observer.unobserve(next);
+
+        fetch(next.dataset.url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            })
+            .then(function(html) {
+                next.remove();
+                results.insertAdjacentHTML('beforeend', html);
+                loading = false;
+                observeNext();
+            })
+            .catch(function() {
+                loading = false;
+                next.innerHTML = '<p class="text-center text-danger">検索結果の取得に失敗しました。</p>';
+            });
+    }
+
+    observeNext();
+});